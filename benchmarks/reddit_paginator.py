@@ -0,0 +1,100 @@
+'''Benchmark the Pushshift paginator of the Reddit scrapers on a 1,000-comment page
+
+The page is tests/data/pushshift_comments.json. Two cases are measured: a regular page, where every item is yielded, and the same page once more, which _iter_api recognises as the end of pagination.
+For each case, the ID comparisons alone are timed with the integer IDs used by _iter_api and with the base-36 string comparison used before. The full _iter_api is timed as well, including JSON decoding and item creation.
+
+Run with snscrape installed, or from the repository root with PYTHONPATH=. python benchmarks/reddit_paginator.py
+'''
+
+import argparse
+import json
+import pathlib
+import snscrape.base
+import snscrape.modules.reddit
+import string
+import timeit
+
+
+_PAGE = pathlib.Path(__file__).parent.parent / 'tests' / 'data' / 'pushshift_comments.json'
+
+
+def _cmp_id(id1, id2):
+	# The base-36 string comparison that _iter_api used before IDs were decoded to integers
+	if id1.startswith('t') and '_' in id1:
+		prefix, id1 = id1.split('_', 1)
+		if not id2.startswith(f'{prefix}_'):
+			raise ValueError('id2 must have the same prefix as id1')
+		_, id2 = id2.split('_', 1)
+	if id1.strip(string.ascii_lowercase + string.digits) != '':
+		raise ValueError('invalid characters in id1')
+	if id2.strip(string.ascii_lowercase + string.digits) != '':
+		raise ValueError('invalid characters in id2')
+	if len(id1) < len(id2):
+		return -1
+	if len(id1) > len(id2):
+		return 1
+	if id1 < id2:
+		return -1
+	if id1 > id2:
+		return 1
+	return 0
+
+
+def _compare_strings(data, lowestIdSeen):
+	if lowestIdSeen is not None and all(_cmp_id(d['id'], lowestIdSeen) >= 0 for d in data):
+		return lowestIdSeen
+	for d in data:
+		if lowestIdSeen is None or _cmp_id(d['id'], lowestIdSeen) == -1:
+			lowestIdSeen = d['id']
+	return lowestIdSeen
+
+
+def _compare_ints(data, lowestIdSeen):
+	ids = [snscrape.modules.reddit._id_to_int(d['id']) for d in data]
+	if lowestIdSeen is not None and min(ids) >= lowestIdSeen:
+		return lowestIdSeen
+	for id_ in ids:
+		if lowestIdSeen is None or id_ < lowestIdSeen:
+			lowestIdSeen = id_
+	return lowestIdSeen
+
+
+def _iter_api(*bodies):
+	# Serve the bodies in order, whatever the until parameter, to _iter_api, which requests pages until it detects the end of pagination
+	bodies = iter(bodies)
+	transport = snscrape.base.MockTransport(lambda request: snscrape.base.MockTransport.response(request, body = next(bodies)))
+	scraper = snscrape.modules.reddit.RedditSubredditScraper('test', transport = transport)
+	url = 'https://api.pushshift.io/reddit/search/comment'
+	return sum(1 for _ in scraper._iter_api(url, {'limit': 1000}))
+
+
+def _time(func, number):
+	return min(timeit.repeat(func, number = number, repeat = 5)) / number
+
+
+def main():
+	parser = argparse.ArgumentParser(description = 'Benchmark the Pushshift paginator of the Reddit scrapers')
+	parser.add_argument('-n', '--number', type = int, default = 200, help = 'Number of runs per measurement; the best of five measurements is reported')
+	args = parser.parse_args()
+
+	body = _PAGE.read_bytes()
+	data = json.loads(body)['data']
+	lowestString = _compare_strings(data, None)
+	lowestInt = _compare_ints(data, None)
+	assert lowestInt == int(lowestString, 36)
+
+	print(f'{len(data)}-item page, time per page')
+	for name, strings, ints in [
+		('regular page', lambda: _compare_strings(data, None), lambda: _compare_ints(data, None)),
+		('end-of-pagination page', lambda: _compare_strings(data, lowestString), lambda: _compare_ints(data, lowestInt)),
+	]:
+		print(f'  ID comparisons, {name}: {_time(strings, args.number) * 1e6:.0f} us with strings, {_time(ints, args.number) * 1e6:.0f} us with integers')
+	# Pagination is ended by an empty page or by the same page again; the difference between the two runs is the time for the end-of-pagination page.
+	endedByEmptyPage = _time(lambda: _iter_api(body, b'{"data": []}'), args.number // 10 or 1)
+	endedBySamePage = _time(lambda: _iter_api(body, body), args.number // 10 or 1)
+	print(f'  _iter_api, regular page followed by an empty page: {endedByEmptyPage * 1e6:.0f} us')
+	print(f'  _iter_api, end-of-pagination page: {(endedBySamePage - endedByEmptyPage) * 1e6:.0f} us')
+
+
+if __name__ == '__main__':
+	main()
@@ -4,12 +4,12 @@ import contextlib
 import dataclasses
 import datetime
 import importlib.metadata
+import importlib.util
 import inspect
 import logging
 import os
 import requests
 # Imported in parse_args() after setting up the logger:
-#import snscrape.base
 #import snscrape.modules
 #import snscrape.version
 import sys
@@ -205,6 +205,28 @@ def parse_format(arg):
 	return out
 
 
+def parse_proxy_file(arg):
+	import snscrape.base
+	try:
+		with open(arg, 'r') as fp:
+			return snscrape.base.ProxyPool.from_file(fp)
+	except (OSError, ValueError) as e:
+		raise argparse.ArgumentTypeError(f'Cannot read proxies from {arg!r}: {e!s}')
+
+
+def parse_timeout(arg):
+	if arg == 'adaptive':
+		import snscrape.base
+		return snscrape.base.AdaptiveTimeout()
+	try:
+		if ',' in arg:
+			connect, read = arg.split(',')
+			return (float(connect), float(read))
+		return float(arg)
+	except ValueError:
+		raise argparse.ArgumentTypeError(f'Cannot parse {arg!r} as a timeout')
+
+
 class CitationAction(argparse.Action):
 	def __init__(self, option_strings, dest = argparse.SUPPRESS, *args, default = argparse.SUPPRESS, **kwargs):
 		super().__init__(option_strings, dest, *args, **kwargs)
@@ -228,8 +250,28 @@ class CitationAction(argparse.Action):
 		parser.exit()
 
 
+class _LazyScraperParser(argparse.ArgumentParser):
+	'''A subparser for a scraper which only imports the scraper's module and sets up its arguments when it is actually used'''
+
+	def __init__(self, *args, scraper = None, **kwargs):
+		super().__init__(*args, **kwargs)
+		self._scraper = scraper
+		self._setUp = scraper is None
+
+	def parse_known_args(self, *args, **kwargs):
+		if not self._setUp:
+			import snscrape.modules
+			cls = snscrape.modules._get_scraper_class(self._scraper)
+			cls._cli_setup_parser(self)
+			self.set_defaults(cls = cls)
+			self._setUp = True
+		namespace, extras = super().parse_known_args(*args, **kwargs)
+		if self._scraper is not None:
+			namespace.cls._cli_validate_args(self, namespace)
+		return namespace, extras
+
+
 def parse_args():
-	import snscrape.base
 	import snscrape.modules
 	import snscrape.version
 
@@ -238,8 +280,14 @@ def parse_args():
 	parser.add_argument('--citation', action = CitationAction, nargs = 0, help = 'Display recommended citation information and exit')
 	parser.add_argument('-v', '--verbose', '--verbosity', dest = 'verbosity', action = 'count', default = 0, help = 'Increase output verbosity')
 	parser.add_argument('--dump-locals', dest = 'dumpLocals', action = 'store_true', default = False, help = 'Dump local variables on serious log messages (warnings or higher)')
+	parser.add_argument('--transport', dest = 'transport', choices = ['requests', 'urllib3', 'http2'], default = 'requests', help = 'HTTP backend; urllib3 has less per-request overhead but ignores proxy environment variables and .netrc, http2 additionally multiplexes concurrent requests over HTTP/2 (requires httpx)')
+	parser.add_argument('--proxy-file', dest = 'proxyPool', type = parse_proxy_file, default = None, metavar = 'FILE',
+		help = 'Send requests through the proxies listed in FILE (one URL per line), preferring the fastest and most reliable ones; per-proxy statistics are logged at the end')
 	parser.add_argument('--retry', '--retries', dest = 'retries', type = int, default = 3, metavar = 'N',
 		help = 'When the connection fails or the server returns an unexpected response, retry up to N times with an exponential backoff')
+	parser.add_argument('--retry-deadline', dest = 'retryDeadline', type = float, default = None, metavar = 'SECONDS', help = 'Give up on a request when retrying it would take longer than SECONDS in total')
+	parser.add_argument('--timeout', dest = 'timeout', type = parse_timeout, default = 10.0, metavar = 'SECONDS',
+		help = 'Request timeout: SECONDS for connecting and reading, CONNECT,READ for separate timeouts, or "adaptive" for read timeouts based on the observed response times of each endpoint')
 	parser.add_argument('-n', '--max-results', dest = 'maxResults', type = lambda x: int(x) if int(x) >= 0 else parser.error('--max-results N must be zero or positive'), metavar = 'N', help = 'Only return the first N results')
 	group = parser.add_mutually_exclusive_group(required = False)
 	group.add_argument('-f', '--format', dest = 'format', type = parse_format, default = None, help = 'Output format')
@@ -249,22 +297,16 @@ def parse_args():
 	parser.add_argument('--since', type = parse_datetime_arg, metavar = 'DATETIME', help = 'Only return results newer than DATETIME')
 	parser.add_argument('--progress', action = 'store_true', default = False, help = 'Report progress on stderr')
 
-	subparsers = parser.add_subparsers(dest = 'scraper', metavar = 'SCRAPER', title = 'scrapers', required = True)
-	classes = snscrape.base.Scraper.__subclasses__()
-	scrapers = {}
-	for cls in classes:
-		if cls.name is not None:
-			scrapers[cls.name] = cls
-		classes.extend(cls.__subclasses__())
-	for scraper, cls in sorted(scrapers.items()):
-		subparser = subparsers.add_parser(cls.name, help = '', formatter_class = argparse.ArgumentDefaultsHelpFormatter)
-		cls._cli_setup_parser(subparser)
-		subparser.set_defaults(cls = cls)
+	subparsers = parser.add_subparsers(dest = 'scraper', metavar = 'SCRAPER', title = 'scrapers', required = True, parser_class = _LazyScraperParser)
+	for scraper in sorted(snscrape.modules._SCRAPERS):
+		subparsers.add_parser(scraper, help = '', formatter_class = argparse.ArgumentDefaultsHelpFormatter, scraper = scraper)
 
 	args = parser.parse_args()
 
 	if not args.withEntity and args.maxResults == 0:
 		parser.error('--max-results 0 is only valid when used with --with-entity')
+	if args.transport == 'http2' and (importlib.util.find_spec('httpx') is None or importlib.util.find_spec('h2') is None):
+		parser.error('--transport http2 requires httpx with HTTP/2 support, install snscrape[http2]')
 	if args.jsonlForBuggyIntParser:
 		args.jsonl = True
 
@@ -344,3 +386,6 @@ def main():
 		except BrokenPipeError:
 			os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
 			sys.exit(1)
+		finally:
+			if args.proxyPool is not None:
+				args.proxyPool.log_stats()
@@ -0,0 +1,329 @@
+# HTML parsing engines for the scrapers working on HTML pages
+# The BS4 engine returns regular bs4.BeautifulSoup objects. The LXML engine parses with lxml.html directly and wraps the elements in lightweight objects providing the subset of the bs4 Tag API that the scrapers use.
+# That way, the extraction code is shared and both engines produce the same items, but the LXML engine avoids building BeautifulSoup's pure-Python tree, which is considerably faster on large pages.
+
+
+import bs4
+import functools
+import lxml.etree
+import lxml.html
+import snscrape.base
+
+
+# Attributes which bs4 treats as multi-valued, i.e. whose values are split into lists, by tag name ('*' for all tags)
+_MULTI_VALUED_ATTRIBUTES = {
+	'*': frozenset(('class', 'accesskey', 'dropzone')),
+	'a': frozenset(('rel', 'rev')),
+	'link': frozenset(('rel', 'rev')),
+	'td': frozenset(('headers',)),
+	'th': frozenset(('headers',)),
+	'form': frozenset(('accept-charset',)),
+	'object': frozenset(('archive',)),
+	'area': frozenset(('rel',)),
+	'icon': frozenset(('sizes',)),
+	'iframe': frozenset(('sandbox',)),
+	'output': frozenset(('for',)),
+}
+
+# Tags which bs4 serialises as empty-element tags (e.g. <br/>) if they have no contents
+_EMPTY_ELEMENT_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem', 'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex', 'nextid', 'spacer'))
+
+# Tags whose strings bs4 serialises without escaping
+_CDATA_CONTAINING_TAGS = ('script', 'style')
+
+# Tags within which bs4 keeps strings consisting only of whitespace; elsewhere, it collapses them into a single newline or space
+_PRESERVE_WHITESPACE_TAGS = ('pre', 'textarea')
+_ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+
+# Tags whose strings bs4 excludes from the text of their ancestors
+_NON_TEXT_TAGS = ('script', 'style', 'template', 'rt', 'rp')
+_TEXT_XPATH = lxml.etree.XPath('.//text()[not(' + ' or '.join(f'ancestor::{tag}' for tag in _NON_TEXT_TAGS) + ')]')
+_ALL_TEXT_XPATH = lxml.etree.XPath('.//text()')
+
+
+class _String(str):
+	'''Equivalent of bs4.element.NavigableString for the LXML engine'''
+
+
+class _Comment(_String):
+	'''Equivalent of bs4.element.Comment for the LXML engine'''
+
+
+def is_string(obj):
+	'''Whether obj is a string node (including comments) as returned by Tag.children or Tag.string on either engine'''
+
+	return isinstance(obj, (bs4.element.NavigableString, _String))
+
+
+def is_comment(obj):
+	'''Whether obj is a comment node as returned by Tag.children or Tag.string on either engine'''
+
+	return isinstance(obj, (bs4.element.Comment, _Comment))
+
+
+def _collapse_whitespace(text):
+	if text and not text.strip(_ASCII_SPACES):
+		return '\n' if '\n' in text else ' '
+	return text
+
+
+def _collapse_whitespace_strings(root):
+	'''Collapse whitespace-only strings in the tree like bs4 does'''
+
+	preserved = set()
+	for element in root.iter(*_PRESERVE_WHITESPACE_TAGS):
+		preserved.update(element.iter())
+	for element in root.iter():
+		if isinstance(element.tag, str) and element not in preserved:
+			element.text = _collapse_whitespace(element.text)
+		if element.getparent() not in preserved:
+			element.tail = _collapse_whitespace(element.tail)
+
+
+def _is_multi_valued(tag, attr):
+	return attr in _MULTI_VALUED_ATTRIBUTES['*'] or attr in _MULTI_VALUED_ATTRIBUTES.get(tag, ())
+
+
+def _escape(s, quote = False):
+	# Equivalent of bs4's 'minimal' formatter
+	s = s.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+	if quote:
+		if '"' not in s:
+			return f'"{s}"'
+		if "'" not in s:
+			return f"'{s}'"
+		return '"' + s.replace('"', '&quot;') + '"'
+	return s
+
+
+def _serialise(element, out):
+	# Serialise element without its tail like str() on the equivalent bs4 Tag
+	if isinstance(element, lxml.etree._Comment):
+		out.append(f'<!--{element.text or ""}-->')
+		return
+	if not isinstance(element.tag, str):
+		# Processing instructions and entities are not part of the bs4 tree.
+		return
+	out.append(f'<{element.tag}')
+	for k, v in sorted(element.attrib.items()):
+		if _is_multi_valued(element.tag, k):
+			v = ' '.join(v.split())
+		out.append(f' {k}={_escape(v, quote = True)}')
+	if element.tag in _EMPTY_ELEMENT_TAGS and not element.text and len(element) == 0:
+		out.append('/>')
+		return
+	out.append('>')
+	escape = (lambda s: s) if element.tag in _CDATA_CONTAINING_TAGS else _escape
+	if element.text:
+		out.append(escape(element.text))
+	for child in element:
+		_serialise(child, out)
+		if child.tail:
+			out.append(escape(child.tail))
+	out.append(f'</{element.tag}>')
+
+
+@functools.lru_cache(maxsize = None)
+def _xpath(expression):
+	return lxml.etree.XPath(expression)
+
+
+@functools.lru_cache(maxsize = None)
+def _lxml_parser(encoding):
+	return lxml.html.HTMLParser(encoding = encoding)
+
+
+def _compile_filters(name, filters):
+	'''Convert bs4-style search filters into an XPath expression with variables and a list of Python predicates for the filters that XPath cannot express'''
+
+	conditions = []
+	variables = {}
+	predicates = []
+
+	def simple_condition(attr, value):
+		var = f'v{len(variables)}'
+		variables[var] = value
+		if attr in _MULTI_VALUED_ATTRIBUTES['*']:
+			# Like bs4, match either one of the values or all of them joined by single spaces
+			if not any(c.isspace() for c in value):
+				return f"contains(concat(' ', normalize-space(@{attr}), ' '), concat(' ', ${var}, ' '))"
+			return f'normalize-space(@{attr}) = ${var}'
+		return f'@{attr} = ${var}'
+
+	for attr, value in filters.items():
+		if value is True:
+			conditions.append(f'@{attr}')
+		elif value is False or value is None:
+			conditions.append(f'not(@{attr})')
+		elif any(attr in attrs for tag, attrs in _MULTI_VALUED_ATTRIBUTES.items() if tag != '*'):
+			# Whether these are multi-valued depends on the tag.
+			predicates.append(functools.partial(_match_attribute, attr, value))
+		elif isinstance(value, str):
+			conditions.append(simple_condition(attr, value))
+		elif isinstance(value, (list, tuple)) and all(isinstance(v, str) for v in value):
+			conditions.append('(' + ' or '.join(simple_condition(attr, v) for v in value) + ')')
+		else:
+			predicates.append(functools.partial(_match_attribute, attr, value))
+
+	if isinstance(name, str):
+		step = name
+	else:
+		step = '*'
+		if name is not None:
+			predicates.append(lambda element: _match_value(element.tag, name))
+	expression = f'.//{step}' + ''.join(f'[{condition}]' for condition in conditions)
+	return expression, variables, predicates
+
+
+def _match_value(value, matchAgainst):
+	if isinstance(matchAgainst, str):
+		return value == matchAgainst
+	if hasattr(matchAgainst, 'search'):
+		return value is not None and matchAgainst.search(value) is not None
+	if callable(matchAgainst):
+		return bool(matchAgainst(value))
+	if isinstance(matchAgainst, (list, tuple, set, frozenset)):
+		return any(_match_value(value, x) for x in matchAgainst)
+	raise TypeError(f'Unsupported filter value: {matchAgainst!r}')
+
+
+def _match_attribute(attr, matchAgainst, element):
+	value = element.get(attr)
+	if value is not None and _is_multi_valued(element.tag, attr):
+		# Like bs4, match against each individual value as well as all of them joined by single spaces
+		values = value.split()
+		return any(_match_value(v, matchAgainst) for v in values) or _match_value(' '.join(values), matchAgainst)
+	return _match_value(value, matchAgainst)
+
+
+class _LxmlTag:
+	'''A lightweight wrapper around an lxml element providing the subset of the bs4.element.Tag API used by the scrapers'''
+
+	__slots__ = ('_element', '_attrs')
+
+	def __init__(self, element):
+		self._element = element
+		self._attrs = None
+
+	@property
+	def name(self):
+		return self._element.tag
+
+	@property
+	def parent(self):
+		parent = self._element.getparent()
+		return _LxmlTag(parent) if parent is not None else None
+
+	@property
+	def attrs(self):
+		if self._attrs is None:
+			self._attrs = {k: (v.split() if _is_multi_valued(self._element.tag, k) else v) for k, v in self._element.attrib.items()}
+		return self._attrs
+
+	def __getitem__(self, key):
+		return self.attrs[key]
+
+	def get(self, key, default = None):
+		return self.attrs.get(key, default)
+
+	def has_attr(self, key):
+		return key in self._element.attrib
+
+	@property
+	def text(self):
+		xpath = _ALL_TEXT_XPATH if self._element.tag in _NON_TEXT_TAGS else _TEXT_XPATH
+		return ''.join(xpath(self._element))
+
+	@property
+	def children(self):
+		if self._element.text:
+			yield _String(self._element.text)
+		for child in self._element:
+			if isinstance(child, lxml.etree._Comment):
+				yield _Comment(child.text or '')
+			elif isinstance(child, lxml.etree._Element) and isinstance(child.tag, str):
+				yield _LxmlTag(child)
+			# Other nodes (processing instructions, entities) are skipped.
+			if child.tail:
+				yield _String(child.tail)
+
+	@property
+	def string(self):
+		children = list(self.children)
+		if len(children) != 1:
+			return None
+		if isinstance(children[0], _LxmlTag):
+			return children[0].string
+		return children[0]
+
+	def _search(self, name, attrs, kwargs, first):
+		filters = dict(attrs) if isinstance(attrs, dict) else {'class': attrs}
+		if 'class_' in kwargs:
+			filters['class'] = kwargs.pop('class_')
+		filters.update(kwargs)
+		expression, variables, predicates = _compile_filters(name, filters)
+		if first and not predicates:
+			expression = f'({expression})[1]'
+		for element in _xpath(expression)(self._element, **variables):
+			if all(predicate(element) for predicate in predicates):
+				yield _LxmlTag(element)
+
+	def find(self, name = None, attrs = {}, **kwargs):
+		return next(self._search(name, attrs, kwargs, first = True), None)
+
+	def find_all(self, name = None, attrs = {}, **kwargs):
+		return list(self._search(name, attrs, kwargs, first = False))
+
+	def __str__(self):
+		out = []
+		_serialise(self._element, out)
+		return ''.join(out)
+
+	def __repr__(self):
+		return str(self)
+
+
+def parse(markup, parser = snscrape.base.HTMLParser.BS4, *, encoding = None):
+	'''Parse markup (str or bytes) with the selected HTMLParser engine and return the document's root
+
+	encoding is only relevant for bytes markup; if it is None, the encoding is detected by the parser.
+	'''
+
+	if parser is snscrape.base.HTMLParser.BS4:
+		if encoding is not None:
+			return bs4.BeautifulSoup(markup, 'lxml', from_encoding = encoding)
+		return bs4.BeautifulSoup(markup, 'lxml')
+	if parser is snscrape.base.HTMLParser.LXML:
+		try:
+			if isinstance(markup, bytes):
+				root = lxml.html.document_fromstring(markup, parser = _lxml_parser(encoding))
+			else:
+				root = lxml.html.document_fromstring(markup)
+		except lxml.etree.ParserError:
+			# Empty document
+			root = lxml.html.document_fromstring('<html></html>')
+		_collapse_whitespace_strings(root)
+		return _LxmlTag(root)
+	raise ValueError(f'Unsupported HTML parser: {parser!r}')
+
+
+class HTMLScraper(snscrape.base.Scraper):
+	'''An abstract base class for scrapers that parse HTML pages with a selectable HTMLParser engine'''
+
+	def __init__(self, *, htmlParser = snscrape.base.HTMLParser.BS4, **kwargs):
+		super().__init__(**kwargs)
+		if htmlParser not in tuple(snscrape.base.HTMLParser):
+			raise ValueError('invalid htmlParser, must be an HTMLParser')
+		self._htmlParser = htmlParser
+
+	def _parse_html(self, markup, encoding = None):
+		return parse(markup, self._htmlParser, encoding = encoding)
+
+	@classmethod
+	def _cli_setup_html_parser_argument(cls, subparser):
+		subparser.add_argument('--html-parser', dest = 'htmlParser', choices = [p.value for p in snscrape.base.HTMLParser], default = snscrape.base.HTMLParser.BS4.value, help = 'HTML parsing engine; lxml is considerably faster')
+
+	@classmethod
+	def _cli_construct(cls, argparseArgs, *args, **kwargs):
+		kwargs['htmlParser'] = snscrape.base.HTMLParser(argparseArgs.htmlParser)
+		return super()._cli_construct(argparseArgs, *args, **kwargs)
@@ -1,17 +1,72 @@
+import importlib
 import pkgutil
 
 
 __all__ = []
 
+# Mapping of scraper names to the module that provides them
+# This allows the CLI to only import the module of the selected scraper instead of all of them. It must be kept in sync with the scrapers' name attributes.
+_SCRAPERS = {
+	'facebook-community': 'facebook',
+	'facebook-group': 'facebook',
+	'facebook-user': 'facebook',
+	'instagram-hashtag': 'instagram',
+	'instagram-location': 'instagram',
+	'instagram-user': 'instagram',
+	'mastodon-profile': 'mastodon',
+	'mastodon-toot': 'mastodon',
+	'reddit-search': 'reddit',
+	'reddit-submission': 'reddit',
+	'reddit-submissions': 'reddit',
+	'reddit-subreddit': 'reddit',
+	'reddit-user': 'reddit',
+	'telegram-channel': 'telegram',
+	'telegram-channels': 'telegram',
+	'twitter-cashtag': 'twitter',
+	'twitter-community': 'twitter',
+	'twitter-hashtag': 'twitter',
+	'twitter-list-posts': 'twitter',
+	'twitter-profile': 'twitter',
+	'twitter-search': 'twitter',
+	'twitter-trends': 'twitter',
+	'twitter-tweet': 'twitter',
+	'twitter-tweets': 'twitter',
+	'twitter-user': 'twitter',
+	'twitter-users': 'twitter',
+	'vkontakte-user': 'vkontakte',
+	'weibo-user': 'weibo',
+}
 
-def _import_modules():
-	prefixLen = len(__name__) + 1
-	for importer, moduleName, isPkg in pkgutil.iter_modules(__path__, prefix = f'{__name__}.'):
+
+def _find_modules():
+	for importer, moduleName, isPkg in pkgutil.iter_modules(__path__):
 		assert not isPkg
-		moduleNameWithoutPrefix = moduleName[prefixLen:]
-		__all__.append(moduleNameWithoutPrefix)
-		module = importer.find_module(moduleName).load_module(moduleName)
-		globals()[moduleNameWithoutPrefix] = module
+		__all__.append(moduleName)
+
+
+def __getattr__(name):
+	# Modules are only imported on first access since importing all of them is slow (bs4, lxml, filelock, the large twitter module, ...).
+	if name in __all__:
+		return importlib.import_module(f'{__name__}.{name}')
+	raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+	return sorted(set(globals()) | set(__all__))
+
+
+def _get_scraper_class(name):
+	'''Import the module providing the scraper `name` and return the scraper class'''
+
+	import snscrape.base
+
+	module = __getattr__(_SCRAPERS[name])
+	classes = snscrape.base.Scraper.__subclasses__()
+	for cls in classes:
+		if cls.name == name and cls.__module__ == module.__name__:
+			return cls
+		classes.extend(cls.__subclasses__())
+	raise RuntimeError(f'Scraper {name!r} not found in {module.__name__}')
 
 
-_import_modules()
+_find_modules()
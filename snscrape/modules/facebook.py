@@ -1,12 +1,12 @@
 __all__ = ['FacebookPost', 'User', 'FacebookUserScraper', 'FacebookCommunityScraper', 'FacebookGroupScraper']
 
 
-import bs4
 import dataclasses
 import datetime
 import json
 import logging
 import re
+import snscrape._html
 import snscrape.base
 import snscrape.utils
 import typing
@@ -50,7 +50,7 @@ class User(snscrape.base.Item):
 		return f'https://www.facebook.com/{self.username}/'
 
 
-class _FacebookCommonScraper(snscrape.base.Scraper):
+class _FacebookCommonScraper(snscrape._html.HTMLScraper):
 	def _clean_url(self, dirtyUrl):
 		u = urllib.parse.urlparse(dirtyUrl)
 		if u.path == '/permalink.php':
@@ -173,7 +173,7 @@ class _FacebookUserAndCommunityScraper(_FacebookCommonScraper):
 			if r.status_code not in (200, 404):
 				raise snscrape.base.ScraperException(f'Got status code {r.status_code}')
 			self._initialPage = r
-			self._initialPageSoup = bs4.BeautifulSoup(r.text, 'lxml')
+			self._initialPageSoup = self._parse_html(r.text)
 		return self._initialPage, self._initialPageSoup
 
 	def get_items(self):
@@ -202,11 +202,12 @@ class _FacebookUserAndCommunityScraper(_FacebookCommonScraper):
 			assert response['domops'][0][1] in ('#www_pages_reaction_see_more_unitwww_pages_home', '#www_pages_reaction_see_more_unitwww_pages_community_tab')
 			assert response['domops'][0][2] == False
 			assert '__html' in response['domops'][0][3]
-			soup = bs4.BeautifulSoup(response['domops'][0][3]['__html'], 'lxml')
+			soup = self._parse_html(response['domops'][0][3]['__html'])
 			yield from self._soup_to_items(soup, self._baseUrl, 'user')
 
 	@classmethod
 	def _cli_setup_parser(cls, subparser):
+		cls._cli_setup_html_parser_argument(subparser)
 		subparser.add_argument('username', type = snscrape.utils.nonempty_string_arg('username'), help = 'A Facebook username or user ID')
 
 	@classmethod
@@ -240,7 +241,7 @@ class FacebookUserScraper(_FacebookUserAndCommunityScraper):
 
 		nameVerifiedMarkup = nameVerifiedMarkupPattern.search(r.text)
 		nameVerifiedMarkup = json.loads(nameVerifiedMarkup.group(1))
-		nameVerifiedSoup = bs4.BeautifulSoup(nameVerifiedMarkup, 'lxml')
+		nameVerifiedSoup = self._parse_html(nameVerifiedMarkup)
 		kwargs['name'] = nameVerifiedSoup.find('a', class_ = '_64-f').text
 		kwargs['verified'] = bool(nameVerifiedSoup.find('a', class_ = '_56_f'))
 
@@ -325,7 +326,7 @@ class FacebookGroupScraper(_FacebookCommonScraper):
 		if 'content:{pagelet_group_mall:{container_id:"' not in r.text:
 			raise snscrape.base.ScraperException('Code container ID marker not found (does the group exist?)')
 
-		soup = bs4.BeautifulSoup(r.text, 'lxml')
+		soup = self._parse_html(r.text)
 
 		# Posts are inside an HTML comment in two code tags with IDs listed in JS...
 		for codeContainerIdStart in ('content:{pagelet_group_mall:{container_id:"', 'content:{group_mall_after_tti:{container_id:"'):
@@ -334,9 +335,9 @@ class FacebookGroupScraper(_FacebookCommonScraper):
 			codeContainer = soup.find('code', id = codeContainerId)
 			if not codeContainer:
 				raise snscrape.base.ScraperException('Code container not found')
-			if type(codeContainer.string) is not bs4.element.Comment:
+			if not snscrape._html.is_comment(codeContainer.string):
 				raise snscrape.base.ScraperException('Code container does not contain a comment')
-			codeSoup = bs4.BeautifulSoup(codeContainer.string, 'lxml')
+			codeSoup = self._parse_html(str(codeContainer.string))
 			yield from self._soup_to_items(codeSoup, baseUrl, 'group')
 
 		# Pagination
@@ -353,11 +354,12 @@ class FacebookGroupScraper(_FacebookCommonScraper):
 			if obj['payload'] == '':
 				# End of pagination
 				break
-			soup = bs4.BeautifulSoup(obj['payload'], 'lxml')
+			soup = self._parse_html(obj['payload'])
 			yield from self._soup_to_items(soup, baseUrl, 'group')
 
 	@classmethod
 	def _cli_setup_parser(cls, subparser):
+		cls._cli_setup_html_parser_argument(subparser)
 		subparser.add_argument('group', type = snscrape.utils.nonempty_string_arg('group'), help = 'A group name or ID')
 
 	@classmethod
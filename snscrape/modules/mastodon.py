@@ -1,20 +1,26 @@
-__all__ = ['Toot', 'Boost', 'Attachment', 'Poll', 'PollOption', 'User', 'CustomEmoji', 'MastodonProfileScraper', 'MastodonTootScraperMode', 'MastodonTootScraper']
+__all__ = ['Toot', 'Boost', 'Attachment', 'Poll', 'PollOption', 'User', 'CustomEmoji', 'set_rate_limit', 'MastodonBackend', 'MastodonProfileScraper', 'MastodonTootScraperMode', 'MastodonTootScraper']
 
 
-import bs4
 import dataclasses
 import datetime
 import enum
+import itertools
 import json
 import logging
+import re
+import snscrape._html
 import snscrape.base
 import snscrape.utils
-import time
+import threading
 import typing
 import urllib.parse
 
 
 _logger = logging.getLogger(__name__)
+_rateLimiters = {}
+_rateLimitConfig = {None: (1 / 3, 1)} # Default: one request every 3 seconds per instance
+_apiRateLimitDefault = (None, 1) # API requests are paced by the X-RateLimit-* response headers instead unless a limit is set for the instance
+_rateLimitLock = threading.Lock()
 
 
 @dataclasses.dataclass
@@ -54,7 +60,7 @@ class Attachment:
 @dataclasses.dataclass
 class Poll:
 	id: str
-	expirationDate: datetime.datetime
+	expirationDate: typing.Optional[datetime.datetime] # None for polls without an expiration date
 	multiple: bool
 	options: typing.List['PollOption']
 	votesCount: int
@@ -92,17 +98,189 @@ class CustomEmoji:
 	staticUrl: str
 
 
-class _MastodonCommonScraper(snscrape.base.Scraper):
-	def __init__(self, **kwargs):
+def _parse_api_datetime(s):
+	# Mastodon API timestamps normally have millisecond precision, e.g. 2023-01-02T03:04:05.678Z, but not all implementations include the fractional part.
+	for format in ('%Y-%m-%dT%H:%M:%S.%fZ', '%Y-%m-%dT%H:%M:%SZ'):
+		try:
+			return datetime.datetime.strptime(s, format).replace(tzinfo = datetime.timezone.utc)
+		except ValueError:
+			continue
+	raise ValueError(f'Unrecognised datetime format: {s!r}')
+
+
+def set_rate_limit(hostname, rate, burst = 1):
+	'''Set the rate limit for requests to the Mastodon instance `hostname` to `rate` requests per second with bursts of up to `burst` requests.
+
+	If hostname is None, this sets the default for all instances without an explicit rate limit. A rate of None disables rate limiting.
+	The default only applies to HTML pages; API requests are paced by the instance's rate limit headers. A limit for a specific instance applies to both.
+	The limits are shared by all Mastodon scrapers in the process and also apply to scrapers that already exist.
+	'''
+
+	with _rateLimitLock:
+		_rateLimitConfig[hostname] = (rate, burst)
+		for (h, api), limiter in _rateLimiters.items():
+			if h == hostname or (hostname is None and not api and h not in _rateLimitConfig):
+				limiter.configure(rate, burst)
+
+
+def _get_rate_limiter(url, api = False):
+	hostname = urllib.parse.urlparse(url).hostname
+	with _rateLimitLock:
+		if (hostname, api) not in _rateLimiters:
+			_rateLimiters[(hostname, api)] = snscrape.base.RateLimiter(*_rateLimitConfig.get(hostname, _apiRateLimitDefault if api else _rateLimitConfig[None]))
+		return _rateLimiters[(hostname, api)]
+
+
+class MastodonBackend(enum.Enum):
+	'''The source the Mastodon scrapers retrieve data from'''
+
+	HTML = 'html' # Server-rendered HTML pages
+	API = 'api' # The public REST API, which returns more toots per request and is paced using the rate limit headers
+	AUTO = 'auto' # The REST API, falling back to HTML pages if the API is unavailable (e.g. on old instances or ones requiring authentication)
+
+	@classmethod
+	def _cli_from_args(cls, args):
+		return cls(args.backend)
+
+
+class _MastodonAPIUnavailable(Exception):
+	pass
+
+
+class _MastodonCommonScraper(snscrape._html.HTMLScraper):
+	def __init__(self, *, backend = MastodonBackend.HTML, **kwargs):
 		super().__init__(**kwargs)
+		if backend not in tuple(MastodonBackend):
+			raise ValueError('invalid backend, must be a MastodonBackend')
+		self._backend = backend
 		self._headers = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64; rv:52.0) Gecko/20100101 Firefox/52.0', 'Accept-Language': 'en-US,en;q=0.5'}
-		self._lastRequest = 0
+		self._apiHeaders = {'User-Agent': self._headers['User-Agent'], 'Accept': 'application/json'}
+
+	def _rate_limited_get(self, url, *args, api = False, **kwargs):
+		_get_rate_limiter(url, api = api).acquire(self._context)
+		return self._get(url, *args, **kwargs)
+
+	def _check_api_response(self, r):
+		if r.status_code == 429:
+			delay = self._api_rate_limit_reset_delay(r)
+			_logger.info(f'Got 429 response, rate limit resets in {delay:.0f} seconds')
+			# Block other scrapers working on the same instance as well; this request waits for the reset as its retry delay.
+			_get_rate_limiter(r.url, api = True).block(delay)
+			r._snscrapeRetryAfter = delay
+			return False, 'rate-limited'
+		if r.status_code >= 500:
+			return False, f'status code {r.status_code}'
+		return True, None
+
+	def _api_rate_limit_reset_delay(self, r):
+		'''Return the number of seconds until the rate limit window of response r resets, defaulting to 10 seconds if unknown'''
+
+		try:
+			reset = _parse_api_datetime(r.headers['X-RateLimit-Reset'])
+		except (KeyError, ValueError):
+			return 10
+		return min(max((reset - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0), 300)
+
+	def _api_get(self, url, params = None):
+		'''Retrieve an API endpoint and return the response, or None if the resource does not exist
+
+		Requests are spaced out evenly over the rate limit window based on the X-RateLimit-* response headers, using a limiter separate from the one for HTML pages.
+		Raises _MastodonAPIUnavailable if the instance does not provide the API or does not permit unauthenticated access.
+		'''
+
+		r = self._rate_limited_get(url, api = True, params = params, headers = self._apiHeaders, responseOkCallback = self._check_api_response)
+		try:
+			remaining = int(r.headers['X-RateLimit-Remaining'])
+		except (KeyError, ValueError):
+			pass
+		else:
+			_get_rate_limiter(url, api = True).block(self._api_rate_limit_reset_delay(r) / max(remaining, 1))
+		if r.status_code in (401, 403) or not r.headers.get('content-type', '').startswith('application/json'):
+			raise _MastodonAPIUnavailable(f'status code {r.status_code}, content type {r.headers.get("content-type")!r}')
+		if r.status_code == 404:
+			return None
+		if r.status_code != 200:
+			raise snscrape.base.ScraperException(f'Got status code {r.status_code}')
+		return r
 
-	def _rate_limited_get(self, *args, **kwargs):
-		if (diff := time.time() - self._lastRequest) < 3:
-			time.sleep(3 - diff)
-		self._lastRequest = time.time()
-		return self._get(*args, **kwargs)
+	def _with_api_fallback(self, apiFunc, htmlFunc):
+		if self._backend is MastodonBackend.HTML:
+			yield from htmlFunc()
+			return
+		gotItems = False
+		try:
+			for item in apiFunc():
+				gotItems = True
+				yield item
+		except _MastodonAPIUnavailable as e:
+			if self._backend is MastodonBackend.API or gotItems:
+				raise snscrape.base.ScraperException(f'API unavailable: {e!s}') from e
+			_logger.warning(f'API unavailable ({e!s}), falling back to HTML')
+			yield from htmlFunc()
+
+	def _api_account_to_user(self, account, url):
+		userKwargs = {}
+		userKwargs['account'] = f'@{account["acct"]}' if '@' in account['acct'] else f'@{account["acct"]}@{urllib.parse.urlparse(url).netloc}'
+		userKwargs['_url'] = account['url']
+		userKwargs['displayName'], userKwargs['displayNameWithCustomEmojis'] = self._api_display_name(account, url)
+		userKwargs['avatarUrl'] = urllib.parse.urljoin(url, account['avatar'])
+		return User(**userKwargs)
+
+	def _api_display_name(self, account, url):
+		# Like on the HTML pages, fall back to the username if there is no display name
+		displayName = account.get('display_name') or account['username']
+		emojis = {f':{e["shortcode"]}:': e for e in account.get('emojis', [])}
+		if not emojis:
+			return displayName, None
+		outFull = []
+		for part in re.split('(' + '|'.join(map(re.escape, emojis)) + ')', displayName):
+			if part in emojis:
+				outFull.append(CustomEmoji(shortName = part, url = urllib.parse.urljoin(url, emojis[part]['url']), staticUrl = urllib.parse.urljoin(url, emojis[part]['static_url'])))
+			elif part:
+				outFull.append(part)
+		if not any(isinstance(x, CustomEmoji) for x in outFull):
+			return displayName, None
+		return displayName, outFull
+
+	def _api_status_to_item(self, status, url):
+		if status.get('reblog'):
+			return Boost(user = self._api_account_to_user(status['account'], url), toot = self._api_status_to_item(status['reblog'], url))
+
+		tootKwargs = {}
+		tootKwargs['url'] = status['url'] or status['uri']
+		tootKwargs['id'] = tootKwargs['url'].rsplit('/', 1)[1]
+		# The HTML pages only have second precision; match that.
+		tootKwargs['date'] = _parse_api_datetime(status['created_at']).replace(microsecond = 0)
+		tootKwargs['user'] = self._api_account_to_user(status['account'], url)
+
+		content = self._parse_html(status['content'] or '<p></p>')
+		paragraphs = '\n\n'.join(p.text for p in content.find_all('p'))
+		if status.get('spoiler_text'):
+			tootKwargs['text'] = status['spoiler_text']
+			tootKwargs['spoilerText'] = paragraphs
+		else:
+			tootKwargs['text'] = paragraphs
+
+		if status.get('media_attachments'):
+			attachments = []
+			for medium in status['media_attachments']:
+				mediumUrl = medium.get('remote_url') or medium['url']
+				attachments.append(Attachment(url = urllib.parse.urljoin(url, mediumUrl), name = mediumUrl.rsplit('/', 1)[-1].strip()))
+			tootKwargs['attachments'] = attachments
+
+		self._content_links_to_kwargs(content, url, tootKwargs)
+
+		if status.get('poll'):
+			tootKwargs['poll'] = self._poll_obj_to_poll(status['poll'])
+
+		return Toot(**tootKwargs)
+
+	@staticmethod
+	def _split_url(url):
+		'''Split a URL into the base URL of the instance and the path'''
+
+		u = urllib.parse.urlparse(url)
+		return f'{u.scheme}://{u.netloc}', u.path
 
 	def _entries_to_items(self, entries, url):
 		for entry in entries:
@@ -160,36 +338,11 @@ class _MastodonCommonScraper(snscrape.base.Scraper):
 					attachments.append(Attachment(url = urllib.parse.urljoin(url, a['href']), name = a['href'].rsplit('/', 1)[1]))
 				tootKwargs['attachments'] = attachments
 
-			links = []
-			mentionedUsers = []
-			hashtags = []
-			for a in content.find_all('a'):
-				cls = a.get('class', [])
-				if 'mention' in cls and 'u-url' in cls:
-					mentionUrl = urllib.parse.urljoin(url, a['href'])
-					mentionedUsers.append(User(account = self._url_to_account(mentionUrl), _url = mentionUrl))
-				elif 'mention' in cls and 'hashtag' in cls:
-					hashtags.append(a.text.strip())
-				else:
-					links.append(urllib.parse.urljoin(url, a['href']))
-			if links:
-				tootKwargs['links'] = links
-			if mentionedUsers:
-				tootKwargs['mentionedUsers'] = mentionedUsers
-			if hashtags:
-				tootKwargs['hashtags'] = hashtags
+			self._content_links_to_kwargs(content, url, tootKwargs)
 
 			if (pollDiv := entry.find('div', attrs = {'data-component': 'Poll'})):
 				o = json.loads(pollDiv['data-props'])
-				pollKwargs = {}
-				pollKwargs['id'] = o['poll']['id']
-				pollKwargs['expirationDate'] = datetime.datetime.strptime(o['poll']['expires_at'], '%Y-%m-%dT%H:%M:%S.%fZ').replace(tzinfo = datetime.timezone.utc)
-				pollKwargs['multiple'] = o['poll']['multiple']
-				pollKwargs['options'] = [PollOption(title = op['title'], votesCount = op['votes_count']) for op in o['poll']['options']]
-				pollKwargs['votesCount'] = o['poll']['votes_count']
-				if 'voters_count' in o['poll']: # 3.0.0 (commit 3babf846)
-					pollKwargs['votersCount'] = o['poll']['voters_count']
-				tootKwargs['poll'] = Poll(**pollKwargs)
+				tootKwargs['poll'] = self._poll_obj_to_poll(o['poll'])
 
 			toot = Toot(**tootKwargs)
 
@@ -209,12 +362,43 @@ class _MastodonCommonScraper(snscrape.base.Scraper):
 
 			yield toot
 
+	def _content_links_to_kwargs(self, content, url, tootKwargs):
+		links = []
+		mentionedUsers = []
+		hashtags = []
+		for a in content.find_all('a'):
+			cls = a.get('class', [])
+			if 'mention' in cls and 'u-url' in cls:
+				mentionUrl = urllib.parse.urljoin(url, a['href'])
+				mentionedUsers.append(User(account = self._url_to_account(mentionUrl), _url = mentionUrl))
+			elif 'mention' in cls and 'hashtag' in cls:
+				hashtags.append(a.text.strip())
+			else:
+				links.append(urllib.parse.urljoin(url, a['href']))
+		if links:
+			tootKwargs['links'] = links
+		if mentionedUsers:
+			tootKwargs['mentionedUsers'] = mentionedUsers
+		if hashtags:
+			tootKwargs['hashtags'] = hashtags
+
+	def _poll_obj_to_poll(self, o):
+		pollKwargs = {}
+		pollKwargs['id'] = o['id']
+		pollKwargs['expirationDate'] = _parse_api_datetime(o['expires_at']) if o['expires_at'] else None
+		pollKwargs['multiple'] = o['multiple']
+		pollKwargs['options'] = [PollOption(title = op['title'], votesCount = op['votes_count']) for op in o['options']]
+		pollKwargs['votesCount'] = o['votes_count']
+		if 'voters_count' in o: # 3.0.0 (commit 3babf846)
+			pollKwargs['votersCount'] = o['voters_count']
+		return Poll(**pollKwargs)
+
 	def _display_name(self, strong, url):
 		outPlain = []
 		outFull = []
 		hasCustomEmoji = False
 		for child in strong.children:
-			if isinstance(child, bs4.element.NavigableString):
+			if snscrape._html.is_string(child):
 				outPlain.append(str(child))
 				outFull.append(str(child))
 			elif child.name == 'img' and 'custom-emoji' in child.get('class', []):
@@ -242,6 +426,15 @@ class _MastodonCommonScraper(snscrape.base.Scraper):
 			return '@' + '@'.join(reversed(url.split('/')[2::2]))
 		raise ValueError('Unrecognised account URL format')
 
+	@classmethod
+	def _cli_setup_backend_argument(cls, subparser):
+		subparser.add_argument('--backend', choices = [b.value for b in MastodonBackend], default = MastodonBackend.HTML.value, help = 'Retrieve data from HTML pages, the REST API, or the REST API with a fallback to HTML pages')
+
+	@classmethod
+	def _cli_construct(cls, argparseArgs, *args, **kwargs):
+		kwargs['backend'] = MastodonBackend._cli_from_args(argparseArgs)
+		return super()._cli_construct(argparseArgs, *args, **kwargs)
+
 
 class MastodonProfileScraper(_MastodonCommonScraper):
 	name = 'mastodon-profile'
@@ -256,6 +449,36 @@ class MastodonProfileScraper(_MastodonCommonScraper):
 		self._url = url
 
 	def get_items(self):
+		yield from self._with_api_fallback(self._get_items_api, self._get_items_html)
+
+	def _get_items_api(self):
+		instanceUrl, path = self._split_url(self._url)
+		try:
+			acct = self._url_to_account(f'{instanceUrl}{path.rstrip("/")}')
+		except ValueError as e:
+			raise _MastodonAPIUnavailable('cannot determine account from URL') from e
+		r = self._api_get(f'{instanceUrl}/api/v1/accounts/lookup', params = {'acct': acct[1:].split('@')[0]})
+		if r is None:
+			# Instances before Mastodon 3.4 don't have the lookup endpoint, so a 404 can't tell whether the account exists; leave that to the HTML backend.
+			raise _MastodonAPIUnavailable('account lookup not found')
+		accountId = r.json()['id']
+		url = f'{instanceUrl}/api/v1/accounts/{accountId}/statuses'
+		params = {'limit': 40}
+		while url:
+			r = self._api_get(url, params = params)
+			if r is None:
+				break
+			statuses = r.json()
+			if not statuses:
+				break
+			for status in statuses:
+				yield self._api_status_to_item(status, instanceUrl)
+			if 'next' in r.links:
+				url, params = r.links['next']['url'], None
+			else:
+				url, params = f'{instanceUrl}/api/v1/accounts/{accountId}/statuses', {'limit': 40, 'max_id': statuses[-1]['id']}
+
+	def _get_items_html(self):
 		initial = True
 		while True:
 			if initial:
@@ -275,7 +498,7 @@ class MastodonProfileScraper(_MastodonCommonScraper):
 				r = self._rate_limited_get(url, headers = self._headers)
 				if r.status_code != 200:
 					raise snscrape.base.ScraperException(f'Got status code {r.status_code}')
-			soup = bs4.BeautifulSoup(r.text, 'lxml')
+			soup = self._parse_html(r.text)
 
 			yield from self._entries_to_items(soup.find('div', class_ = 'activity-stream').find_all('div', class_ = 'entry'), r.url)
 
@@ -290,6 +513,8 @@ class MastodonProfileScraper(_MastodonCommonScraper):
 
 	@classmethod
 	def _cli_setup_parser(cls, subparser):
+		cls._cli_setup_html_parser_argument(subparser)
+		cls._cli_setup_backend_argument(subparser)
 		subparser.add_argument('account', type = snscrape.utils.nonempty_string_arg('account'), help = 'A Mastodon account. This can be either a URL to the profile page or a string of the form @account@instance.example.org')
 
 	@classmethod
@@ -317,13 +542,34 @@ class MastodonTootScraper(_MastodonCommonScraper):
 		self._mode = mode
 
 	def get_items(self):
+		yield from self._with_api_fallback(self._get_items_api, self._get_items_html)
+
+	def _get_items_api(self):
+		instanceUrl, path = self._split_url(self._url)
+		tootId = path.rstrip('/').rsplit('/', 1)[-1]
+		if not tootId.isdigit():
+			raise _MastodonAPIUnavailable('cannot determine toot ID from URL')
+		r = self._api_get(f'{instanceUrl}/api/v1/statuses/{tootId}')
+		if r is None:
+			_logger.warning('Toot does not exist')
+			return
+		status = r.json()
+		if self._mode is MastodonTootScraperMode.SINGLE:
+			yield self._api_status_to_item(status, instanceUrl)
+		elif self._mode is MastodonTootScraperMode.THREAD:
+			r = self._api_get(f'{instanceUrl}/api/v1/statuses/{tootId}/context')
+			context = r.json() if r is not None else {'ancestors': [], 'descendants': []}
+			for s in itertools.chain(context['ancestors'], [status], context['descendants']):
+				yield self._api_status_to_item(s, instanceUrl)
+
+	def _get_items_html(self):
 		r = self._rate_limited_get(self._url, headers = self._headers)
 		if r.status_code == 404:
 			_logger.warning('Toot does not exist')
 			return
 		if r.status_code != 200:
 			raise snscrape.base.ScraperException(f'Got status code {r.status_code}')
-		soup = bs4.BeautifulSoup(r.text, 'lxml')
+		soup = self._parse_html(r.text)
 		if self._mode is MastodonTootScraperMode.SINGLE:
 			status = soup.find('div', class_ = 'detailed-status')
 			entry = status.parent
@@ -333,6 +579,8 @@ class MastodonTootScraper(_MastodonCommonScraper):
 
 	@classmethod
 	def _cli_setup_parser(cls, subparser):
+		cls._cli_setup_html_parser_argument(subparser)
+		cls._cli_setup_backend_argument(subparser)
 		subparser.add_argument('--thread', action = 'store_true', help = 'Collect thread around the toot referenced by the URL')
 		subparser.add_argument('url', type = snscrape.utils.nonempty_string_arg('url'), help = 'A URL for a toot')
 
@@ -1,8 +1,10 @@
-__all__ = ['Submission', 'Comment', 'RedditUserScraper', 'RedditSubredditScraper', 'RedditSearchScraper', 'RedditSubmissionScraper']
+__all__ = ['Submission', 'Comment', 'RedditUserScraper', 'RedditSubredditScraper', 'RedditSearchScraper', 'RedditSubmissionScraper', 'RedditSubmissionsScraper']
 
 
+import argparse
 import dataclasses
 import datetime
+import functools
 import logging
 import re
 import snscrape.base
@@ -14,6 +16,12 @@ import typing
 
 
 _logger = logging.getLogger(__name__)
+_ID_CHARACTERS = string.ascii_lowercase + string.digits
+_rateLimiter = snscrape.base.RateLimiter(1, burst = 1) # Shared by the requests of all concurrently retrieving scrapers; Pushshift allows about one request per second
+_PUSHSHIFT_EPOCH = 1119484800 # 2005-06-23, the founding of Reddit; lower bound for time partitions if no after timestamp is given
+_PARTITIONS_PER_WORKER = 4 # Time partitions are not equally dense, so create more partitions than workers to spread the load
+_QUEUE_SIZE = 5000 # Maximum number of items buffered per concurrently retrieved stream (time partition or comment tree)
+_MAX_IDS_PER_REQUEST = 500 # Pushshift returns up to 1000 results per request, but that many IDs would make for an overly long URL
 
 
 # Most of these fields should never be None, but due to broken data, they sometimes are anyway...
@@ -51,32 +59,19 @@ class Comment(snscrape.base.Item):
 		return self.url
 
 
-def _cmp_id(id1, id2):
-	'''Compare two Reddit IDs. Returns -1 if id1 is less than id2, 0 if they are equal, and 1 if id1 is greater than id2.
+def _id_to_int(id_):
+	'''Decode a base-36 Reddit ID, optionally with a prefix like t1_, to an integer for comparisons'''
 
-	id1 and id2 may have prefixes like t1_, but if included, they must be present on both and equal.'''
-
-	if id1.startswith('t') and '_' in id1:
-		prefix, id1 = id1.split('_', 1)
-		if not id2.startswith(f'{prefix}_'):
-			raise ValueError('id2 must have the same prefix as id1')
-		_, id2 = id2.split('_', 1)
-	if id1.strip(string.ascii_lowercase + string.digits) != '':
-		raise ValueError('invalid characters in id1')
-	if id2.strip(string.ascii_lowercase + string.digits) != '':
-		raise ValueError('invalid characters in id2')
-	if len(id1) < len(id2):
-		return -1
-	if len(id1) > len(id2):
-		return 1
-	if id1 < id2:
-		return -1
-	if id1 > id2:
-		return 1
-	return 0
+	if id_.startswith('t') and '_' in id_:
+		id_ = id_.partition('_')[2]
+	if id_.strip(_ID_CHARACTERS) != '':
+		raise ValueError('invalid characters in ID')
+	return int(id_, 36)
 
 
 class _RedditPushshiftScraper(snscrape.base.Scraper):
+	_concurrency = 1 # Overridden by the scrapers that retrieve concurrently
+
 	def __init__(self, **kwargs):
 		super().__init__(**kwargs)
 		self._headers = {'User-Agent': f'snscrape/{snscrape.version.__version__}'}
@@ -84,13 +79,18 @@ class _RedditPushshiftScraper(snscrape.base.Scraper):
 	def _handle_rate_limiting(self, r):
 		if r.status_code == 429:
 			_logger.info('Got 429 response, sleeping')
-			time.sleep(10)
+			# Make concurrent requests back off as well
+			_rateLimiter.block(10)
+			self._context.sleep(10)
 			return False, 'rate-limited'
 		if r.status_code != 200:
 			return False, 'non-200 status code'
 		return True, None
 
 	def _get_api(self, url, params = None):
+		if self._concurrency > 1:
+			# Concurrent workers could exceed Pushshift's rate limit together; a single stream of requests is paced by the response times.
+			_rateLimiter.acquire(self._context)
 		r = self._get(url, params = params, headers = self._headers, responseOkCallback = self._handle_rate_limiting)
 		if r.status_code != 200:
 			raise snscrape.base.ScraperException(f'Got status code {r.status_code}')
@@ -141,28 +141,33 @@ class _RedditPushshiftScraper(snscrape.base.Scraper):
 			params = {}
 		while True:
 			obj = self._get_api(url, params = params)
-			if not obj['data'] or (lowestIdSeen is not None and all(_cmp_id(d['id'], lowestIdSeen) >= 0 for d in obj['data'])): # end of pagination
+			# Decode each ID only once; all comparisons below are on integers.
+			ids = [_id_to_int(d['id']) for d in obj['data']]
+			if not ids or (lowestIdSeen is not None and min(ids) >= lowestIdSeen): # end of pagination
 				break
-			for d in obj['data']:
-				if lowestIdSeen is None or _cmp_id(d['id'], lowestIdSeen) == -1:
+			for d, id_ in zip(obj['data'], ids):
+				if lowestIdSeen is None or id_ < lowestIdSeen:
 					yield self._api_obj_to_item(d)
-					lowestIdSeen = d['id']
+					lowestIdSeen = id_
 			params['until'] = obj["data"][-1]["created_utc"] + 1
 
 
 class _RedditPushshiftSearchScraper(_RedditPushshiftScraper):
-	def __init__(self, name, *, submissions = True, comments = True, before = None, after = None, **kwargs):
+	def __init__(self, name, *, submissions = True, comments = True, before = None, after = None, concurrency = 1, **kwargs):
 		super().__init__(**kwargs)
 		self._name = name
 		self._submissions = submissions
 		self._comments = comments
 		self._before = before
 		self._after = after
+		self._concurrency = concurrency
 
 		if not type(self)._validationFunc(self._name):
 			raise ValueError(f'invalid {type(self).name.split("-", 1)[1]} name')
 		if not self._submissions and not self._comments:
 			raise ValueError('At least one of submissions and comments must be True')
+		if self._concurrency < 1:
+			raise ValueError('concurrency must be positive')
 
 	def _iter_api_submissions_and_comments(self, params: dict):
 		# Retrieve both submissions and comments, interleave the results to get a reverse-chronological order
@@ -173,47 +178,54 @@ class _RedditPushshiftSearchScraper(_RedditPushshiftScraper):
 			params['since'] = self._after
 
 		if self._submissions:
-			submissionsIter = self._iter_api('https://api.pushshift.io/reddit/search/submission', params.copy()) # Pass copies to prevent the two iterators from messing each other up by using the same dict
+			submissionsIter = self._iter_api_partitioned('https://api.pushshift.io/reddit/search/submission', params.copy()) # Pass copies to prevent the two iterators from messing each other up by using the same dict
 		else:
 			submissionsIter = iter(())
 		if self._comments:
-			commentsIter = self._iter_api('https://api.pushshift.io/reddit/search/comment', params.copy())
+			commentsIter = self._iter_api_partitioned('https://api.pushshift.io/reddit/search/comment', params.copy())
 		else:
 			commentsIter = iter(())
 
-		try:
-			tipSubmission = next(submissionsIter)
-		except StopIteration:
-			# There are no submissions, just yield comments and return
-			yield from commentsIter
-			return
-		try:
-			tipComment = next(commentsIter)
-		except StopIteration:
-			# There are no comments, just yield submissions and return
-			yield tipSubmission
-			yield from submissionsIter
-			return
-
-		while True:
-			# Return newer first; if both have the same creation datetime, return the comment first
-			if tipSubmission.date > tipComment.date:
-				yield tipSubmission
-				try:
-					tipSubmission = next(submissionsIter)
-				except StopIteration:
-					# Reached the end of submissions, just yield the remaining comments and stop
-					yield tipComment
-					yield from commentsIter
-					break
-			else:
-				yield tipComment
-				try:
-					tipComment = next(commentsIter)
-				except StopIteration:
-					yield tipSubmission
-					yield from submissionsIter
-					break
+		# On equal creation datetimes, comments are returned first
+		yield from snscrape.base.merge_items(commentsIter, submissionsIter)
+
+	def _iter_api_partitioned(self, url, params):
+		'''Like _iter_api but with the time range split into partitions that are retrieved concurrently if self._concurrency is greater than 1
+
+		The partitions are yielded from in reverse-chronological order, so the items are in the same order as with _iter_api.
+		'''
+
+		if self._concurrency == 1:
+			return self._iter_api(url, params)
+		return self._iter_partitions(url, params)
+
+	def _partition_bounds(self):
+		# Returns a list of (lower, upper) timestamps, newest partition first; the items of a partition are those with lower <= created_utc < upper, and None means unbounded.
+		newest = self._before if self._before is not None else int(time.time()) + 1
+		oldest = self._after if self._after is not None else _PUSHSHIFT_EPOCH
+		n = max(1, min(self._concurrency * _PARTITIONS_PER_WORKER, newest - oldest))
+		boundaries = [newest - (newest - oldest) * i // n for i in range(n + 1)]
+		bounds = list(zip(boundaries[1:], boundaries[:-1]))
+		# The outermost partitions use the original parameters, or none at all
+		bounds[0] = (bounds[0][0], None)
+		bounds[-1] = (None, bounds[-1][1])
+		return bounds
+
+	def _iter_partition(self, url, params, lower, upper):
+		params = params.copy()
+		if upper is not None:
+			params['until'] = upper
+		if lower is not None:
+			params['since'] = lower - 1
+		# Pushshift's since and until are both exclusive, i.e. since < created_utc < until; _iter_api's pagination relies on this for until as well. So the request covers exactly lower <= created_utc < upper.
+		# Filtering the items on the same bounds makes each item's own timestamp decide its partition, so adjacent partitions never overlap.
+		for item in self._iter_api(url, params):
+			timestamp = int(item.date.timestamp())
+			if (lower is None or timestamp >= lower) and (upper is None or timestamp < upper):
+				yield item
+
+	def _iter_partitions(self, url, params):
+		yield from snscrape.base._iter_concurrently((functools.partial(self._iter_partition, url, params, lower, upper) for lower, upper in self._partition_bounds()), self._concurrency, _QUEUE_SIZE)
 
 	def get_items(self):
 		yield from self._iter_api_submissions_and_comments({type(self)._apiField: self._name})
@@ -224,13 +236,14 @@ class _RedditPushshiftSearchScraper(_RedditPushshiftScraper):
 		subparser.add_argument('--no-comments', dest = 'noComments', action = 'store_true', default = False, help = 'Don\'t list comments')
 		subparser.add_argument('--before', metavar = 'TIMESTAMP', type = int, help = 'Fetch results before a Unix timestamp')
 		subparser.add_argument('--after', metavar = 'TIMESTAMP', type = int, help = 'Fetch results after a Unix timestamp')
+		subparser.add_argument('--concurrency', metavar = 'N', type = int, default = 1, help = 'Split the time range into partitions and retrieve up to N of them concurrently')
 		name = cls.name.split('-', 1)[1]
 		subparser.add_argument(name, type = snscrape.utils.nonempty_string_arg(name))
 
 	@classmethod
 	def _cli_from_args(cls, args):
 		name = cls.name.split('-', 1)[1]
-		return cls._cli_construct(args, getattr(args, name), submissions = not args.noSubmissions, comments = not args.noComments, before = args.before, after = args.after)
+		return cls._cli_construct(args, getattr(args, name), submissions = not args.noSubmissions, comments = not args.noComments, before = args.before, after = args.after, concurrency = args.concurrency)
 
 
 class RedditUserScraper(_RedditPushshiftSearchScraper):
@@ -278,3 +291,59 @@ class RedditSubmissionScraper(_RedditPushshiftScraper):
 	@classmethod
 	def _cli_from_args(cls, args):
 		return cls._cli_construct(args, args.submissionId)
+
+
+class RedditSubmissionsScraper(_RedditPushshiftScraper):
+	'''Retrieve many submissions and their comments
+
+	The submissions are looked up in batches, and the comments of up to `concurrency` submissions are retrieved concurrently. The output is in the order of submissionIds, each submission followed by its comments as with RedditSubmissionScraper.
+	'''
+
+	name = 'reddit-submissions'
+
+	def __init__(self, submissionIds, *, concurrency = 4, **kwargs):
+		submissionIds = [submissionId[3:] if submissionId.startswith('t3_') else submissionId for submissionId in submissionIds]
+		if any(submissionId.strip(_ID_CHARACTERS) != '' or submissionId == '' for submissionId in submissionIds):
+			raise ValueError('invalid submissionId')
+		if concurrency < 1:
+			raise ValueError('concurrency must be positive')
+		super().__init__(**kwargs)
+		self._submissionIds = submissionIds
+		self._concurrency = concurrency
+
+	def _iter_submissions(self, submission):
+		yield self._api_obj_to_item(submission)
+		yield from self._iter_api('https://api.pushshift.io/reddit/search/comment', {'link_id': int(submission['id'], 36), 'limit': 1000})
+
+	def _iter_submission_factories(self):
+		for i in range(0, len(self._submissionIds), _MAX_IDS_PER_REQUEST):
+			batch = self._submissionIds[i : i + _MAX_IDS_PER_REQUEST]
+			obj = self._get_api('https://api.pushshift.io/reddit/search/submission', params = {'ids': ','.join(batch), 'limit': len(batch)})
+			submissions = {d['id']: d for d in obj['data']}
+			for submissionId in batch:
+				if submissionId not in submissions:
+					_logger.warning(f'Submission {submissionId} not found')
+					continue
+				yield functools.partial(self._iter_submissions, submissions[submissionId])
+
+	def get_items(self):
+		yield from snscrape.base._iter_concurrently(self._iter_submission_factories(), self._concurrency, _QUEUE_SIZE)
+
+	@classmethod
+	def _cli_setup_parser(cls, subparser):
+		subparser.add_argument('--concurrency', metavar = 'N', type = int, default = 4, help = 'Retrieve the comments of up to N submissions concurrently')
+		subparser.add_argument('--ids-file', dest = 'idsFile', metavar = 'FILE', type = argparse.FileType('r'), help = 'Read submission IDs from FILE, one per line (- for stdin)')
+		subparser.add_argument('submissionId', nargs = '*', type = snscrape.utils.nonempty_string_arg('submissionId'))
+
+	@classmethod
+	def _cli_validate_args(cls, subparser, args):
+		if not args.submissionId and args.idsFile is None:
+			subparser.error('no submission IDs given, pass at least one submissionId or --ids-file')
+
+	@classmethod
+	def _cli_from_args(cls, args):
+		submissionIds = list(args.submissionId)
+		if args.idsFile is not None:
+			with args.idsFile as fp:
+				submissionIds.extend(line.strip() for line in fp if line.strip())
+		return cls._cli_construct(args, submissionIds, concurrency = args.concurrency)
@@ -1,19 +1,24 @@
-__all__ = ['LinkPreview', 'TelegramPost', 'Channel', 'TelegramChannelScraper']
+__all__ = ['LinkPreview', 'TelegramPost', 'Channel', 'TelegramChannelScraper', 'TelegramChannelsScraper']
 
 
-import bs4
 import dataclasses
 import datetime
+import functools
 import logging
+import queue
 import re
+import snscrape._html
 import snscrape.base
 import snscrape.utils
+import threading
 import typing
 import urllib.parse
 
 
 _logger = logging.getLogger(__name__)
 _SINGLE_MEDIA_LINK_PATTERN = re.compile(r'^https://t\.me/[^/]+/\d+\?single$')
+_PAGE_SIZE = 20 # Number of messages per page
+_BATCH_QUEUE_SIZE = 1000 # Maximum number of posts buffered per channel in TelegramChannelsScraper
 
 
 @dataclasses.dataclass
@@ -61,12 +66,15 @@ class Channel(snscrape.base.Item):
 		return f'https://t.me/s/{self.username}'
 
 
-class TelegramChannelScraper(snscrape.base.Scraper):
+class TelegramChannelScraper(snscrape._html.HTMLScraper):
 	name = 'telegram-channel'
 
-	def __init__(self, name, **kwargs):
+	def __init__(self, name, *, concurrency = 1, **kwargs):
 		super().__init__(**kwargs)
+		if concurrency < 1:
+			raise ValueError('concurrency must be positive')
 		self._name = name
+		self._concurrency = concurrency
 		self._headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/81.0.4044.138 Safari/537.36'}
 		self._initialPage = None
 		self._initialPageSoup = None
@@ -76,7 +84,7 @@ class TelegramChannelScraper(snscrape.base.Scraper):
 			r = self._get(f'https://t.me/s/{self._name}', headers = self._headers)
 			if r.status_code != 200:
 				raise snscrape.base.ScraperException(f'Got status code {r.status_code}')
-			self._initialPage, self._initialPageSoup = r, bs4.BeautifulSoup(r.text, 'lxml')
+			self._initialPage, self._initialPageSoup = r, self._parse_html(r.text)
 		return self._initialPage, self._initialPageSoup
 
 	def _soup_to_items(self, soup, pageUrl, onlyUsername = False):
@@ -133,6 +141,9 @@ class TelegramChannelScraper(snscrape.base.Scraper):
 		if '/s/' not in r.url:
 			_logger.warning('No public post list for this user')
 			return
+		if self._concurrency > 1:
+			yield from self._get_items_concurrently(r, soup)
+			return
 		while True:
 			yield from self._soup_to_items(soup, r.url)
 			pageLink = soup.find('a', attrs = {'class': 'tme_messages_more', 'data-before': True})
@@ -142,7 +153,65 @@ class TelegramChannelScraper(snscrape.base.Scraper):
 			r = self._get(nextPageUrl, headers = self._headers)
 			if r.status_code != 200:
 				raise snscrape.base.ScraperException(f'Got status code {r.status_code}')
-			soup = bs4.BeautifulSoup(r.text, 'lxml')
+			soup = self._parse_html(r.text)
+
+	def _get_page(self, baseUrl, before):
+		r = self._get(f'{baseUrl}?before={before}', headers = self._headers)
+		if r.status_code != 200:
+			raise snscrape.base.ScraperException(f'Got status code {r.status_code}')
+		return r.url, self._parse_html(r.text)
+
+	@staticmethod
+	def _page_before(soup):
+		if (pageLink := soup.find('a', attrs = {'class': 'tme_messages_more', 'data-before': True})):
+			return int(pageLink['data-before'])
+		return None
+
+	@staticmethod
+	def _post_id(post):
+		try:
+			return int(post.url.rsplit('/', 1)[1])
+		except ValueError:
+			return None
+
+	def _get_items_concurrently(self, r, soup):
+		# Pagination is just ?before=<message ID>, and each page contains the _PAGE_SIZE messages preceding that ID.
+		# So the windows below the current position can be fetched speculatively in steps of _PAGE_SIZE.
+		# Deleted messages make a page reach further back than _PAGE_SIZE IDs, i.e. it overlaps with the following windows.
+		# To continue without gaps from a page whose oldest message is `before`, the smallest window >= before is used, and posts that were already emitted are filtered out by ID.
+		# Windows above that can no longer be used and are discarded.
+		baseUrl = r.url.split('?', 1)[0]
+		yield from self._soup_to_items(soup, r.url)
+		before = self._page_before(soup)
+		if before is None:
+			return
+		futures = {}
+		nextWindow = before
+		with snscrape.base._ThreadPoolExecutor(max_workers = self._concurrency) as executor:
+			try:
+				while True:
+					while len(futures) < self._concurrency and nextWindow > 1:
+						if nextWindow not in futures:
+							futures[nextWindow] = executor.submit(self._get_page, baseUrl, nextWindow)
+						nextWindow -= _PAGE_SIZE
+					if not (candidates := [w for w in futures if w >= before]):
+						futures[before] = executor.submit(self._get_page, baseUrl, before)
+						candidates = [before]
+					window = min(candidates)
+					for w in [w for w in futures if w > window]:
+						futures.pop(w).cancel()
+					pageUrl, pageSoup = futures.pop(window).result()
+					for post in self._soup_to_items(pageSoup, pageUrl):
+						if (postId := self._post_id(post)) is None or postId < before:
+							yield post
+					newBefore = self._page_before(pageSoup)
+					if newBefore is None or newBefore >= before:
+						break
+					before = newBefore
+					nextWindow = min(nextWindow, before)
+			finally:
+				for future in futures.values():
+					future.cancel()
 
 	def _get_entity(self):
 		kwargs = {}
@@ -150,7 +219,7 @@ class TelegramChannelScraper(snscrape.base.Scraper):
 		r = self._get(f'https://t.me/{self._name}', headers = self._headers)
 		if r.status_code != 200:
 			raise snscrape.base.ScraperException(f'Got status code {r.status_code}')
-		soup = bs4.BeautifulSoup(r.text, 'lxml')
+		soup = self._parse_html(r.text)
 		membersDiv = soup.find('div', class_ = 'tgme_page_extra')
 		if membersDiv.text.endswith(' subscribers'):
 			kwargs['members'] = int(membersDiv.text[:-12].replace(' ', ''))
@@ -197,8 +266,83 @@ class TelegramChannelScraper(snscrape.base.Scraper):
 
 	@classmethod
 	def _cli_setup_parser(cls, subparser):
+		cls._cli_setup_html_parser_argument(subparser)
+		subparser.add_argument('--concurrency', metavar = 'N', type = int, default = 1, help = 'Retrieve up to N pages concurrently')
 		subparser.add_argument('channel', type = snscrape.utils.nonempty_string_arg('channel'), help = 'A channel name')
 
 	@classmethod
 	def _cli_from_args(cls, args):
-		return cls._cli_construct(args, args.channel)
+		return cls._cli_construct(args, args.channel, concurrency = args.concurrency)
+
+
+class TelegramChannelsScraper(snscrape._html.HTMLScraper):
+	'''Scrape the posts of multiple channels over one connection pool
+
+	Up to `concurrency` channels are scraped at the same time. With `interleave`, posts are yielded as they arrive; otherwise, the channels' posts are yielded one channel after the other in the order of `names`.
+	A channel that cannot be scraped does not abort the others; a ScraperException is raised at the end instead.
+	'''
+
+	name = 'telegram-channels'
+
+	def __init__(self, names, *, concurrency = 4, interleave = False, **kwargs):
+		super().__init__(**kwargs)
+		if concurrency < 1:
+			raise ValueError('concurrency must be positive')
+		self._names = names
+		self._concurrency = concurrency
+		self._interleave = interleave
+		if self._connectionPool is None:
+			self._session.mount('https://', snscrape.base._HTTPSAdapter(pool_maxsize = concurrency))
+
+	def _channel_scraper(self, name):
+		scraper = TelegramChannelScraper(name, retryPolicy = self._retryPolicy, circuitBreaker = self._circuitBreaker, retryBudget = self._retryBudget, timeout = self._timeout, proxies = self._proxies, connectionPool = self._connectionPool, transport = self._transport, htmlParser = self._htmlParser)
+		scraper._session = self._session
+		return scraper
+
+	def _channel_items(self, name, failed):
+		try:
+			yield from self._channel_scraper(name).get_items()
+		except Exception as e:
+			_logger.error(f'Error scraping channel {name}: {type(e).__module__}.{type(e).__name__}: {e!s}')
+			failed.append(name)
+
+	def _iter_interleaved(self, iteratorFactories):
+		stop = threading.Event()
+		q = queue.Queue(maxsize = _BATCH_QUEUE_SIZE * self._concurrency)
+		with snscrape.base._ThreadPoolExecutor(max_workers = self._concurrency) as executor:
+			futures = [executor.submit(snscrape.base._fill_queue, iteratorFactory, q, stop) for iteratorFactory in iteratorFactories]
+			try:
+				remaining = len(futures)
+				while remaining:
+					_, item, exc = q.get()
+					if exc is not None:
+						raise exc
+					if item is None:
+						remaining -= 1
+					else:
+						yield item
+			finally:
+				stop.set()
+				for future in futures:
+					future.cancel()
+
+	def get_items(self):
+		failed = []
+		iteratorFactories = [functools.partial(self._channel_items, name, failed) for name in self._names]
+		if self._interleave:
+			yield from self._iter_interleaved(iteratorFactories)
+		else:
+			yield from snscrape.base._iter_concurrently(iteratorFactories, self._concurrency, _BATCH_QUEUE_SIZE)
+		if failed:
+			raise snscrape.base.ScraperException(f'Could not scrape {len(failed)} channel(s): {", ".join(failed)}')
+
+	@classmethod
+	def _cli_setup_parser(cls, subparser):
+		cls._cli_setup_html_parser_argument(subparser)
+		subparser.add_argument('--concurrency', metavar = 'N', type = int, default = 4, help = 'Scrape up to N channels concurrently')
+		subparser.add_argument('--interleave', action = 'store_true', default = False, help = 'Output posts in the order they are retrieved instead of grouped by channel')
+		subparser.add_argument('channel', type = snscrape.utils.nonempty_string_arg('channel'), nargs = '+', help = 'A channel name')
+
+	@classmethod
+	def _cli_from_args(cls, args):
+		return cls._cli_construct(args, args.channel, concurrency = args.concurrency, interleave = args.interleave)
@@ -61,6 +61,7 @@ __all__ = [
 	'TwitterCashtagScraper',
 	'TwitterTweetScraperMode',
 	'TwitterTweetScraper',
+	'TwitterTweetsScraper',
 	'TwitterListPostsScraper',
 	'TwitterCommunityScraper',
 	'TwitterTrendsScraper',
@@ -68,6 +69,7 @@ __all__ = [
 ]
 
 
+import argparse
 import base64
 import collections
 import copy
@@ -82,11 +84,13 @@ import json
 import random
 import logging
 import os
+import queue
 import re
 import requests.adapters
 import snscrape.base
 import snscrape.utils
 import string
+import threading
 import time
 import typing
 import urllib.parse
@@ -97,7 +101,12 @@ import warnings
 _logger = logging.getLogger(__name__)
 _API_AUTHORIZATION_HEADER = 'Bearer AAAAAAAAAAAAAAAAAAAAANRILgAAAAAAnNwIzUejRCOuH5E6I8xnZz4puTs=1Zv7ttfk8LF81IUq16cHjhLTvJu4FA33AGWWjCpTnA'
 _globalGuestTokenManager = None
+_globalGuestTokenManagerLock = threading.Lock()
 _GUEST_TOKEN_VALIDITY = 10800
+_USERS_BY_REST_IDS_CHUNK_SIZE = 100 # Number of user IDs per UsersByRestIds request
+_CONVERSATION_QUEUE_SIZE = 1000 # Maximum number of tweets buffered per concurrently retrieved conversation in TwitterTweetScraper's RECURSE mode
+_GUEST_TOKEN_BLOCKED_STATUSES = (403, 404, 429) # Status codes with which Twitter rejects a guest token that is blocked or rate-limited
+_CHUNK_ATTEMPTS = 3 # How often a chunk is attempted, each time with a new guest token, before giving up
 _CIPHERS_CHROME = 'TLS_AES_128_GCM_SHA256:TLS_AES_256_GCM_SHA384:TLS_CHACHA20_POLY1305_SHA256:ECDHE-ECDSA-AES128-GCM-SHA256:ECDHE-RSA-AES128-GCM-SHA256:ECDHE-ECDSA-AES256-GCM-SHA384:ECDHE-RSA-AES256-GCM-SHA384:ECDHE-ECDSA-CHACHA20-POLY1305:ECDHE-RSA-CHACHA20-POLY1305:ECDHE-RSA-AES128-SHA:ECDHE-RSA-AES256-SHA:AES128-GCM-SHA256:AES256-GCM-SHA384:AES128-SHA:AES256-SHA'
 
 
@@ -642,16 +651,31 @@ class Trend(snscrape.base.Item):
 		return f'https://twitter.com/search?q={urllib.parse.quote(self.name)}'
 
 
+def _read_ids_file(fp):
+	# Lazily read numeric IDs from an open file, one per line, closing it at the end
+	with fp:
+		for line in fp:
+			if (line := line.strip()):
+				yield int(line)
+
+
 class _ScrollDirection(enum.Enum):
 	TOP = enum.auto()
 	BOTTOM = enum.auto()
 	BOTH = enum.auto()
 
 
+class _GuestTokenBlocked(snscrape.base.ScraperException):
+	# Raised by _TwitterAPIScraper._get_api_data when the retries were exhausted because Twitter kept blocking or rate-limiting the guest tokens
+	pass
+
+
 class GuestTokenManager:
 	def __init__(self):
 		self._token = None
 		self._setTime = 0.0
+		self.proxy = None # The proxy through which the token is used when scraping with a ProxyPool
+		self.threadLock = threading.RLock() # Held by scrapers while checking, retrieving, or resetting the token
 
 	@property
 	def token(self):
@@ -669,6 +693,7 @@ class GuestTokenManager:
 	def reset(self, *, blockUntil = None):
 		self._token = None
 		self._setTime = 0.0
+		self.proxy = None
 
 
 class _CLIGuestTokenManager(GuestTokenManager):
@@ -688,7 +713,7 @@ class _CLIGuestTokenManager(GuestTokenManager):
 			os.mkdir(dir, mode = 0o700)
 		self._file = os.path.join(dir, 'cli-twitter-guest-token.json')
 		self._lockFile = f'{self._file}.lock'
-		self._lock = filelock.FileLock(self._lockFile)
+		self._fileLock = filelock.FileLock(self._lockFile)
 
 	def _locked_load(self):
 		if not os.path.exists(self._file):
@@ -708,10 +733,13 @@ class _CLIGuestTokenManager(GuestTokenManager):
 		return o
 
 	def _read(self):
-		with self._lock:
+		with self._fileLock:
 			o = self._locked_load()
 		if not o:
+			# Finding no cached token doesn't invalidate the proxy through which the next one is retrieved, so keep the pin.
+			proxy = self.proxy
 			self.reset()
+			self.proxy = proxy
 			return None
 		# Select a random non-blocked valid token if there is one
 		currentTime = time.time()
@@ -725,7 +753,7 @@ class _CLIGuestTokenManager(GuestTokenManager):
 		self._blockedUntil = 0
 
 	def _write(self):
-		with self._lock:
+		with self._fileLock:
 			# Read existing file
 			o = self._locked_load()
 			if not o:
@@ -783,10 +811,9 @@ class _CLIGuestTokenManager(GuestTokenManager):
 
 
 class _TwitterTLSAdapter(snscrape.base._HTTPSAdapter):
-	def init_poolmanager(self, *args, **kwargs):
+	def ssl_context(self):
 		#FIXME: When urllib3 2.0.0 is out and can be required, this should use urllib3.util.create_urllib3_context instead of the private, undocumented ssl_ module.
-		kwargs['ssl_context'] = urllib3.util.ssl_.create_urllib3_context(ciphers = _CIPHERS_CHROME)
-		super().init_poolmanager(*args, **kwargs)
+		return urllib3.util.ssl_.create_urllib3_context(ciphers = _CIPHERS_CHROME)
 
 
 class _TwitterAPIType(enum.Enum):
@@ -800,9 +827,10 @@ class _TwitterAPIScraper(snscrape.base.Scraper):
 		self._baseUrl = baseUrl
 		if guestTokenManager is None:
 			global _globalGuestTokenManager
-			if _globalGuestTokenManager is None:
-				_globalGuestTokenManager = GuestTokenManager()
-			guestTokenManager = _globalGuestTokenManager
+			with _globalGuestTokenManagerLock:
+				if _globalGuestTokenManager is None:
+					_globalGuestTokenManager = GuestTokenManager()
+				guestTokenManager = _globalGuestTokenManager
 		self._guestTokenManager = guestTokenManager
 		self._maxEmptyPages = maxEmptyPages
 		self._apiHeaders = {
@@ -810,50 +838,93 @@ class _TwitterAPIScraper(snscrape.base.Scraper):
 			'Referer': self._baseUrl,
 			'Accept-Language': 'en-US,en;q=0.5',
 		}
-		adapter = _TwitterTLSAdapter()
+		adapter = self._adapter(_TwitterTLSAdapter)
 		self._session.mount('https://twitter.com', adapter)
 		self._session.mount('https://api.twitter.com', adapter)
+		self._threadLocal = threading.local()
+
+	def _thread_scraper(self):
+		'''Return a scraper for making API requests from the current worker thread
+
+		Each worker thread gets its own session (sharing the connection pool if there is one). The guest token manager is shared, so a caller-supplied manager keeps its state, and a token that gets blocked is replaced once for all threads.
+		'''
+
+		if (scraper := getattr(self._threadLocal, 'scraper', None)) is None:
+			scraper = _TwitterAPIScraper(self._baseUrl, guestTokenManager = self._guestTokenManager, maxEmptyPages = self._maxEmptyPages, retryPolicy = self._retryPolicy, circuitBreaker = self._circuitBreaker, retryBudget = self._retryBudget, timeout = self._timeout, proxies = self._proxies, connectionPool = self._connectionPool, transport = self._transport)
+			self._threadLocal.scraper = scraper
+		return scraper
+
+	def _get_api_data_with_new_tokens(self, scraper, description, *args, **kwargs):
+		# Like scraper._get_api_data, but if the request fails because the guest tokens were blocked, it is attempted again with a new guest token up to _CHUNK_ATTEMPTS times in total.
+		# Other failures (e.g. server errors, network problems, or an open circuit) say nothing about the token and are raised immediately.
+		# The blocked token was already unset by _check_api_response, so the next attempt uses a new one.
+		for attempt in range(_CHUNK_ATTEMPTS):
+			try:
+				return scraper._get_api_data(*args, **kwargs)
+			except _GuestTokenBlocked as e:
+				if attempt == _CHUNK_ATTEMPTS - 1:
+					raise
+				_logger.warning(f'Retrieving {description} failed ({e!s}), retrying with a new guest token')
 
 	def _check_guest_token_response(self, r):
 		if r.status_code != 200:
 			return False, ('non-200 response' if r.status_code != 404 else 'blocked') + f' ({r.status_code})'
 		return True, None
 
+	def _pinned_proxy(self):
+		# Guest tokens are used through the proxy that obtained them as long as that proxy is healthy.
+		proxy = self._guestTokenManager.proxy
+		if proxy is not None and isinstance(self._proxies, snscrape.base.ProxyPool) and self._proxies.healthy(proxy):
+			return proxy
+		return None
+
 	def _ensure_guest_token(self, url = None):
-		if self._guestTokenManager.token is None:
-			_logger.info('Retrieving guest token')
-			r = self._get(self._baseUrl if url is None else url, responseOkCallback = self._check_guest_token_response)
-			if (match := re.search(r'document\.cookie = decodeURIComponent\("gt=(\d+); Max-Age=10800; Domain=\.twitter\.com; Path=/; Secure"\);', r.text)):
-				_logger.debug('Found guest token in HTML')
-				self._guestTokenManager.token = match.group(1)
-			if 'gt' in r.cookies:
-				_logger.debug('Found guest token in cookies')
-				self._guestTokenManager.token = r.cookies['gt']
-			if not self._guestTokenManager.token:
-				_logger.debug('No guest token in response')
-				_logger.info('Retrieving guest token via API')
-				r = self._post('https://api.twitter.com/1.1/guest/activate.json', data = b'', headers = self._apiHeaders, responseOkCallback = self._check_guest_token_response)
-				o = r.json()
-				if not o.get('guest_token'):
-					raise snscrape.base.ScraperException('Unable to retrieve guest token')
-				self._guestTokenManager.token = o['guest_token']
-			assert self._guestTokenManager.token
-		_logger.debug(f'Using guest token {self._guestTokenManager.token}')
-		self._session.cookies.set('gt', self._guestTokenManager.token, domain = '.twitter.com', path = '/', secure = True, expires = self._guestTokenManager.setTime + _GUEST_TOKEN_VALIDITY)
-		self._apiHeaders['x-guest-token'] = self._guestTokenManager.token
-
-	def _unset_guest_token(self, blockUntil):
-		self._guestTokenManager.reset(blockUntil = blockUntil)
-		del self._session.cookies['gt']
-		del self._apiHeaders['x-guest-token']
+		# The lock prevents concurrent threads from retrieving tokens at the same time and keeps the token, the cookie, and the header consistent.
+		with self._guestTokenManager.threadLock:
+			if isinstance(self._proxies, snscrape.base.ProxyPool) and self._guestTokenManager.proxy is None:
+				# Pin the token to be retrieved, or an existing one from elsewhere (e.g. the CLI's token cache), to a proxy.
+				self._guestTokenManager.proxy = self._proxies.select()
+			if self._guestTokenManager.token is None:
+				_logger.info('Retrieving guest token')
+				r = self._get(self._baseUrl if url is None else url, responseOkCallback = self._check_guest_token_response)
+				if (match := re.search(r'document\.cookie = decodeURIComponent\("gt=(\d+); Max-Age=10800; Domain=\.twitter\.com; Path=/; Secure"\);', r.text)):
+					_logger.debug('Found guest token in HTML')
+					self._guestTokenManager.token = match.group(1)
+				if 'gt' in r.cookies:
+					_logger.debug('Found guest token in cookies')
+					self._guestTokenManager.token = r.cookies['gt']
+				if not self._guestTokenManager.token:
+					_logger.debug('No guest token in response')
+					_logger.info('Retrieving guest token via API')
+					r = self._post('https://api.twitter.com/1.1/guest/activate.json', data = b'', headers = self._apiHeaders, responseOkCallback = self._check_guest_token_response)
+					o = r.json()
+					if not o.get('guest_token'):
+						raise snscrape.base.ScraperException('Unable to retrieve guest token')
+					self._guestTokenManager.token = o['guest_token']
+				assert self._guestTokenManager.token
+			_logger.debug(f'Using guest token {self._guestTokenManager.token}')
+			self._session.cookies.set('gt', self._guestTokenManager.token, domain = '.twitter.com', path = '/', secure = True, expires = self._guestTokenManager.setTime + _GUEST_TOKEN_VALIDITY)
+			self._apiHeaders['x-guest-token'] = self._guestTokenManager.token
+
+	def _unset_guest_token(self, blockUntil, *, token = None):
+		# If token is given, it is only unset if it is still the current one; another thread may have replaced it already.
+		with self._guestTokenManager.threadLock:
+			if token is not None and token != self._apiHeaders.get('x-guest-token'):
+				return
+			self._guestTokenManager.reset(blockUntil = blockUntil)
+			with snscrape.base._cookie_jar_lock(self._session.cookies):
+				del self._session.cookies['gt']
+			self._apiHeaders.pop('x-guest-token', None)
 
 	def _check_api_response(self, r, apiType, instructionsPath):
-		if r.status_code in (403, 404, 429):
+		if r.status_code in _GUEST_TOKEN_BLOCKED_STATUSES:
 			if r.status_code == 429 and r.headers.get('x-rate-limit-remaining', '') == '0' and 'x-rate-limit-reset' in r.headers:
 				blockUntil = min(int(r.headers['x-rate-limit-reset']), int(time.time()) + 900)
 			else:
 				blockUntil = int(time.time()) + 300
-			self._unset_guest_token(blockUntil)
+			if (token := r.request.headers.get('x-guest-token')) is not None:
+				# Without a token, the request was sent while another thread was replacing the token.
+				self._unset_guest_token(blockUntil, token = token)
 			self._ensure_guest_token()
 			return False, f'blocked ({r.status_code})'
 		if r.headers.get('content-type', '').replace(' ', '') != 'application/json;charset=utf-8':
@@ -883,7 +954,17 @@ class _TwitterAPIScraper(snscrape.base.Scraper):
 		self._ensure_guest_token()
 		if apiType is _TwitterAPIType.GRAPHQL:
 			params = urllib.parse.urlencode({k: json.dumps(v, separators = (',', ':')) for k, v in params.items()}, quote_via = urllib.parse.quote)
-		r = self._get(endpoint, params = params, headers = self._apiHeaders, responseOkCallback = functools.partial(self._check_api_response, apiType = apiType, instructionsPath = instructionsPath))
+		lastStatus = None
+		def check_response(r):
+			nonlocal lastStatus
+			lastStatus = r.status_code
+			return self._check_api_response(r, apiType, instructionsPath)
+		try:
+			r = self._get(endpoint, params = params, headers = self._apiHeaders, responseOkCallback = check_response)
+		except snscrape.base.ScraperException as e:
+			if lastStatus in _GUEST_TOKEN_BLOCKED_STATUSES:
+				raise _GuestTokenBlocked(str(e)) from e
+			raise
 		return r._snscrapeObj
 
 	def _iter_api_data(self, endpoint, apiType, params, paginationParams = None, cursor = None, direction = _ScrollDirection.BOTTOM, instructionsPath = None):
@@ -1506,7 +1587,10 @@ class _TwitterAPIScraper(snscrape.base.Scraper):
 				raise snscrape.base.ScraperException('Cannot handle unavailable tweet without tweet ID')
 			return TweetRef(id = tweetId)
 		else:
-			raise snscrape.base.ScraperException(f'Unknown result type {result["__typename"]!r}')
+			if tweetId is None:
+				raise snscrape.base.ScraperException(f'Unknown result type {result["__typename"]!r}')
+			_logger.warning(f'Unknown result type {result["__typename"]!r} for tweet {tweetId}, using TweetRef')
+			return TweetRef(id = tweetId)
 		tweet = result['legacy']
 		user = self._graphql_user_results_to_user(result['core']['user_results'], userId = int(result['legacy']['user_id_str']))
 		if 'retweeted_status_result' in tweet:
@@ -1893,7 +1977,7 @@ class TwitterProfileScraper(TwitterUserScraper):
 		paginationParams = {'variables': paginationVariables, 'features': features}
 
 		gotPinned = False
-		previousPagesTweetIds = set()
+		previousPagesTweetIds = snscrape.base.BoundedSet(1000)
 		for obj in self._iter_api_data('https://twitter.com/i/api/graphql/fn9oRltM1N4thkh5CVusPg/UserTweetsAndReplies', _TwitterAPIType.GRAPHQL, params, paginationParams, instructionsPath = ['data', 'user', 'result', 'timeline_v2', 'timeline', 'instructions']):
 			if not obj['data'] or 'result' not in obj['data']['user']:
 				raise snscrape.base.ScraperException('Empty response')
@@ -1966,11 +2050,22 @@ class TwitterTweetScraperMode(enum.Enum):
 
 
 class TwitterTweetScraper(_TwitterAPIScraper):
+	'''Retrieve a tweet, its conversation, or everything reachable from it recursively, depending on the mode
+
+	concurrency, maxDepth, and maxConversations only apply to the RECURSE mode. Up to `concurrency` conversations are retrieved concurrently.
+	Tweets found in the conversation of tweetId have depth 1, tweets found in their conversations depth 2, etc.; tweets at maxDepth are still yielded, but their conversations are not retrieved. maxConversations limits the total number of conversations retrieved.
+	'''
+
 	name = 'twitter-tweet'
 
-	def __init__(self, tweetId, *, mode = TwitterTweetScraperMode.SINGLE, **kwargs):
+	def __init__(self, tweetId, *, mode = TwitterTweetScraperMode.SINGLE, concurrency = 1, maxDepth = None, maxConversations = None, **kwargs):
+		if concurrency < 1:
+			raise ValueError('concurrency must be positive')
 		self._tweetId = tweetId
 		self._mode = mode
+		self._concurrency = concurrency
+		self._maxDepth = maxDepth
+		self._maxConversations = maxConversations
 		super().__init__(f'https://twitter.com/i/web/status/{self._tweetId}', **kwargs)
 
 	def get_items(self):
@@ -2038,32 +2133,65 @@ class TwitterTweetScraper(_TwitterAPIScraper):
 			if hasModeratedReplies:
 				yield from self._get_moderated_replies(self._tweetId)
 		elif self._mode is TwitterTweetScraperMode.RECURSE:
-			seenTweets = set()
-			queue = collections.deque()
-			queue.append(self._tweetId)
-			while queue:
-				tweetId = queue.popleft()
-				thisPagParams = copy.deepcopy(paginationParams)
-				thisPagParams['variables']['focalTweetId'] = str(tweetId)
-				thisParams = copy.deepcopy(thisPagParams)
-				del thisPagParams['variables']['cursor'], thisPagParams['variables']['referrer']
-				hasModeratedReplies = False
-				for obj in self._iter_api_data(url, _TwitterAPIType.GRAPHQL, thisParams, thisPagParams, direction = _ScrollDirection.BOTH, instructionsPath = instructionsPath):
-					if not obj['data']:
-						continue
-					for tweet in self._graphql_timeline_instructions_to_tweets(obj['data']['threaded_conversation_with_injections_v2']['instructions'], includeConversationThreads = True):
-						if tweet.id not in seenTweets:
-							yield tweet
-							seenTweets.add(tweet.id)
-							if tweet.id != self._tweetId:  # Already queued at the beginning
-								queue.append(tweet.id)
-					hasModeratedReplies = hasModeratedReplies or self._has_moderated_replies(obj, tweetId)
-				if hasModeratedReplies:
-					for tweet in self._get_moderated_replies(tweetId):
-						if tweet.id not in seenTweets:
-							yield tweet
-							seenTweets.add(tweet.id)
-							queue.append(tweet.id)
+			yield from self._recurse(url, paginationVariables, features, instructionsPath)
+
+	def _iter_conversation(self, tweetId, url, paginationVariables, features, instructionsPath):
+		# Yield all tweets in the conversation of tweetId including moderated replies page by page; this runs in a worker thread.
+		scraper = self._thread_scraper() if self._concurrency > 1 else self
+		variables = paginationVariables.copy()
+		variables['focalTweetId'] = str(tweetId)
+		thisPagVariables = {k: v for k, v in variables.items() if k not in ('cursor', 'referrer')}
+		hasModeratedReplies = False
+		for obj in scraper._iter_api_data(url, _TwitterAPIType.GRAPHQL, {'variables': variables, 'features': features}, {'variables': thisPagVariables, 'features': features}, direction = _ScrollDirection.BOTH, instructionsPath = instructionsPath):
+			if not obj['data']:
+				continue
+			yield from self._graphql_timeline_instructions_to_tweets(obj['data']['threaded_conversation_with_injections_v2']['instructions'], includeConversationThreads = True)
+			hasModeratedReplies = hasModeratedReplies or self._has_moderated_replies(obj, tweetId)
+		if hasModeratedReplies:
+			yield from self._get_moderated_replies(tweetId, scraper = scraper)
+
+	def _recurse(self, url, paginationVariables, features, instructionsPath):
+		# Breadth-first expansion of the conversations, with up to self._concurrency conversations being retrieved at a time.
+		# The workers put the tweets on a shared bounded queue as each page arrives, tagged with the conversation's depth; new tweets are yielded and their conversations queued from there.
+		# Only this generator modifies seenTweets and the frontier, so no locking is needed.
+		seenTweets = set()
+		frontier = collections.deque([(self._tweetId, 0)])
+		conversations = 0
+		running = 0 # Conversations whose end message has not been received yet
+		futures = []
+		stop = threading.Event()
+		q = queue.Queue(maxsize = _CONVERSATION_QUEUE_SIZE * self._concurrency)
+		executor = snscrape.base._ThreadPoolExecutor(max_workers = self._concurrency)
+		try:
+			while frontier or running:
+				while frontier and running < self._concurrency and (self._maxConversations is None or conversations < self._maxConversations):
+					tweetId, depth = frontier.popleft()
+					iteratorFactory = functools.partial(self._iter_conversation, tweetId, url, paginationVariables, features, instructionsPath)
+					futures.append(executor.submit(snscrape.base._fill_queue, iteratorFactory, q, stop, key = depth))
+					running += 1
+					conversations += 1
+				if not running:
+					_logger.warning(f'Reached the limit of {self._maxConversations} conversations, stopping recursion')
+					break
+				depth, tweet, exc = q.get()
+				if exc is not None:
+					raise exc
+				if tweet is None:
+					running -= 1
+					futures = [future for future in futures if not future.done()]
+					continue
+				if tweet.id in seenTweets:
+					continue
+				yield tweet
+				seenTweets.add(tweet.id)
+				if tweet.id != self._tweetId and (self._maxDepth is None or depth + 1 < self._maxDepth):  # The focal tweet was already queued at the beginning
+					frontier.append((tweet.id, depth + 1))
+		finally:
+			stop.set()
+			for future in futures:
+				future.cancel()
+			# Don't wait for conversations that are still being retrieved when the generator is closed early
+			executor.shutdown(wait = False)
 
 	def _has_moderated_replies(self, obj, tweetId):
 		for instruction in obj['data']['threaded_conversation_with_injections_v2']['instructions']:
@@ -2074,7 +2202,7 @@ class TwitterTweetScraper(_TwitterAPIScraper):
 					return entry['content']['itemContent'].get('hasModeratedReplies', False)
 		return False
 
-	def _get_moderated_replies(self, tweetId):
+	def _get_moderated_replies(self, tweetId, scraper = None):
 		paginationVariables = {
 			'rootTweetId': str(tweetId),
 			'count': 20,
@@ -2109,7 +2237,7 @@ class TwitterTweetScraper(_TwitterAPIScraper):
 		url = 'https://twitter.com/i/api/graphql/pOVQRe-x12WZeawviP7zxw/ModeratedTimeline'
 		instructionsPath = ['data', 'tweet', 'result', 'timeline_response', 'timeline', 'instructions']
 
-		for obj in self._iter_api_data(url, _TwitterAPIType.GRAPHQL, params, paginationParams, direction = _ScrollDirection.BOTH, instructionsPath = instructionsPath):
+		for obj in (scraper or self)._iter_api_data(url, _TwitterAPIType.GRAPHQL, params, paginationParams, direction = _ScrollDirection.BOTH, instructionsPath = instructionsPath):
 			yield from self._graphql_timeline_instructions_to_tweets(obj['data']['tweet']['result']['timeline_response']['timeline']['instructions'], includeConversationThreads = True)
 
 	@classmethod
@@ -2117,11 +2245,93 @@ class TwitterTweetScraper(_TwitterAPIScraper):
 		group = subparser.add_mutually_exclusive_group(required = False)
 		group.add_argument('--scroll', action = 'store_true', default = False, help = 'Enable scrolling in both directions')
 		group.add_argument('--recurse', '--recursive', action = 'store_true', default = False, help = 'Enable recursion through all tweets encountered (warning: slow, potentially memory-intensive!)')
+		subparser.add_argument('--concurrency', metavar = 'N', type = int, default = 1, help = 'With --recurse, retrieve up to N conversations concurrently')
+		subparser.add_argument('--max-depth', dest = 'maxDepth', metavar = 'N', type = int, help = 'With --recurse, do not retrieve the conversations of tweets more than N levels away from the tweet')
+		subparser.add_argument('--max-conversations', dest = 'maxConversations', metavar = 'N', type = int, help = 'With --recurse, retrieve at most N conversations')
 		subparser.add_argument('tweetId', type = int, help = 'A tweet ID')
 
 	@classmethod
 	def _cli_from_args(cls, args):
-		return cls._cli_construct(args, args.tweetId, mode = TwitterTweetScraperMode._cli_from_args(args))
+		return cls._cli_construct(args, args.tweetId, mode = TwitterTweetScraperMode._cli_from_args(args), concurrency = args.concurrency, maxDepth = args.maxDepth, maxConversations = args.maxConversations)
+
+
+class TwitterTweetsScraper(_TwitterAPIScraper):
+	'''Hydrate many tweets by their IDs
+
+	tweetIds can be any iterable, e.g. a generator reading from a file; it is consumed lazily. Up to `concurrency` tweets are retrieved concurrently, and for every ID, a Tweet, Tombstone, or TweetRef is yielded in input order. Tweets that cannot be retrieved are yielded as TweetRefs too; only an unavailable host aborts the scrape.
+	'''
+
+	name = 'twitter-tweets'
+
+	def __init__(self, tweetIds, *, concurrency = 1, **kwargs):
+		if concurrency < 1:
+			raise ValueError('concurrency must be positive')
+		self._tweetIds = tweetIds
+		self._concurrency = concurrency
+		super().__init__('https://twitter.com/', **kwargs)
+
+	def _get_tweet(self, tweetId):
+		variables = {
+			'tweetId': str(tweetId),
+			'withCommunity': False,
+			'includePromotedContent': False,
+			'withVoice': False,
+		}
+		features = {
+			'creator_subscriptions_tweet_preview_api_enabled': True,
+			'tweetypie_unmention_optimization_enabled': True,
+			'responsive_web_edit_tweet_api_enabled': True,
+			'graphql_is_translatable_rweb_tweet_is_translatable_enabled': True,
+			'view_counts_everywhere_api_enabled': True,
+			'longform_notetweets_consumption_enabled': True,
+			'responsive_web_twitter_article_tweet_consumption_enabled': False,
+			'tweet_awards_web_tipping_enabled': False,
+			'freedom_of_speech_not_reach_fetch_enabled': True,
+			'standardized_nudges_misinfo': True,
+			'tweet_with_visibility_results_prefer_gql_limited_actions_policy_enabled': True,
+			'longform_notetweets_rich_text_read_enabled': True,
+			'longform_notetweets_inline_media_enabled': True,
+			'responsive_web_graphql_exclude_directive_enabled': True,
+			'verified_phone_label_enabled': False,
+			'responsive_web_media_download_video_enabled': False,
+			'responsive_web_graphql_skip_user_profile_image_extensions_enabled': False,
+			'responsive_web_graphql_timeline_navigation_enabled': True,
+			'responsive_web_enhance_cards_enabled': False,
+		}
+		scraper = self._thread_scraper() if self._concurrency > 1 else self
+		# Unlike TweetDetail, this only returns the tweet itself rather than the entire conversation.
+		try:
+			obj = self._get_api_data_with_new_tokens(scraper, f'tweet {tweetId}', 'https://twitter.com/i/api/graphql/0hWvDhmW8YQ-S_ib3azIrw/TweetResultByRestId', _TwitterAPIType.GRAPHQL, params = {'variables': variables, 'features': features}, instructionsPath = ['data', 'tweetResult'])
+		except snscrape.base.HostUnavailable:
+			raise
+		except snscrape.base.ScraperException as e:
+			# One tweet that cannot be retrieved shouldn't abort the others.
+			_logger.error(f'Could not retrieve tweet {tweetId} ({e!s}), using TweetRef')
+			return TweetRef(id = tweetId)
+		if not obj['data'] or 'result' not in obj['data'].get('tweetResult', {}):
+			return TweetRef(id = tweetId)
+		return self._graphql_timeline_tweet_item_result_to_tweet(obj['data']['tweetResult']['result'], tweetId = tweetId)
+
+	def get_items(self):
+		yield from snscrape.base._map_concurrently(self._get_tweet, self._tweetIds, self._concurrency)
+
+	@classmethod
+	def _cli_setup_parser(cls, subparser):
+		subparser.add_argument('--concurrency', metavar = 'N', type = int, default = 1, help = 'Retrieve up to N tweets concurrently')
+		subparser.add_argument('--ids-file', dest = 'idsFile', metavar = 'FILE', type = argparse.FileType('r'), help = 'Read tweet IDs from FILE, one per line (- for stdin)')
+		subparser.add_argument('tweetId', type = int, nargs = '*', help = 'A tweet ID')
+
+	@classmethod
+	def _cli_validate_args(cls, subparser, args):
+		if not args.tweetId and args.idsFile is None:
+			subparser.error('no tweet IDs given, pass at least one tweetId or --ids-file')
+
+	@classmethod
+	def _cli_from_args(cls, args):
+		tweetIds = args.tweetId
+		if args.idsFile is not None:
+			tweetIds = itertools.chain(tweetIds, _read_ids_file(args.idsFile))
+		return cls._cli_construct(args, tweetIds, concurrency = args.concurrency)
 
 
 class TwitterListPostsScraper(TwitterSearchScraper):
@@ -2288,34 +2498,61 @@ class TwitterTrendsScraper(_TwitterAPIScraper):
 
 
 class TwitterUsersScraper(_TwitterAPIScraper):
+	'''Retrieve users by their numeric IDs
+
+	userIds can be any iterable, e.g. a generator reading from a file; it is consumed lazily. The IDs are looked up in chunks, up to `concurrency` of them concurrently, and the users are yielded in input order.
+	'''
+
 	name = 'twitter-users'
 
-	def __init__(self, userIds, **kwargs):
+	def __init__(self, userIds, *, concurrency = 1, **kwargs):
+		if concurrency < 1:
+			raise ValueError('concurrency must be positive')
 		self._userIds = userIds
-		super().__init__(f'https://twitter.com/i/user/{self._userIds[0]}', **kwargs)
+		self._concurrency = concurrency
+		super().__init__('https://twitter.com/', **kwargs)
 
-	def get_items(self):
-		variables = {'userIds': [str(x) for x in self._userIds]}
+	def _get_users_chunk(self, userIds):
+		variables = {'userIds': [str(x) for x in userIds]}
 		features = {
 			'responsive_web_graphql_exclude_directive_enabled': True,
 			'verified_phone_label_enabled': False,
 			'responsive_web_graphql_skip_user_profile_image_extensions_enabled': False,
 			'responsive_web_graphql_timeline_navigation_enabled': True,
 		}
-		obj = self._get_api_data('https://twitter.com/i/api/graphql/GD4q8bBE2i6cqWw2iT74Gg/UsersByRestIds', _TwitterAPIType.GRAPHQL, params = {'variables': variables, 'features': features}, instructionsPath = ['data', 'users'])
+		scraper = self._thread_scraper() if self._concurrency > 1 else self
+		obj = self._get_api_data_with_new_tokens(scraper, f'users {userIds[0]} to {userIds[-1]}', 'https://twitter.com/i/api/graphql/GD4q8bBE2i6cqWw2iT74Gg/UsersByRestIds', _TwitterAPIType.GRAPHQL, params = {'variables': variables, 'features': features}, instructionsPath = ['data', 'users'])
+		users = []
 		for i, u in enumerate(obj['data']['users']):
 			if not u:
-				_logger.warning(f'Skipping empty response object at position {i}')
+				_logger.warning(f'Skipping empty response object at position {i} for user {userIds[i] if i < len(userIds) else "?"}')
 				continue
-			yield self._graphql_user_results_to_user(u)
+			users.append(self._graphql_user_results_to_user(u))
+		return users
+
+	def get_items(self):
+		userIds = iter(self._userIds)
+		chunks = iter(lambda: list(itertools.islice(userIds, _USERS_BY_REST_IDS_CHUNK_SIZE)), [])
+		for users in snscrape.base._map_concurrently(self._get_users_chunk, chunks, self._concurrency):
+			yield from users
 
 	@classmethod
 	def _cli_setup_parser(cls, subparser):
-		subparser.add_argument('userId', type = int, nargs = '+', help = 'A numeric user ID')
+		subparser.add_argument('--concurrency', metavar = 'N', type = int, default = 1, help = 'Retrieve up to N chunks of users concurrently')
+		subparser.add_argument('--ids-file', dest = 'idsFile', metavar = 'FILE', type = argparse.FileType('r'), help = 'Read user IDs from FILE, one per line (- for stdin)')
+		subparser.add_argument('userId', type = int, nargs = '*', help = 'A numeric user ID')
+
+	@classmethod
+	def _cli_validate_args(cls, subparser, args):
+		if not args.userId and args.idsFile is None:
+			subparser.error('no user IDs given, pass at least one userId or --ids-file')
 
 	@classmethod
 	def _cli_from_args(cls, args):
-		return cls._cli_construct(args, args.userId)
+		userIds = args.userId
+		if args.idsFile is not None:
+			userIds = itertools.chain(userIds, _read_ids_file(args.idsFile))
+		return cls._cli_construct(args, userIds, concurrency = args.concurrency)
 
 
 __getattr__, __dir__ = snscrape.utils.module_deprecation_helper(__all__, DescriptionURL = TextLink)
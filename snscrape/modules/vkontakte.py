@@ -1,14 +1,13 @@
 __all__ = ['VKontaktePost', 'Photo', 'PhotoVariant', 'Video', 'User', 'VKontakteUserScraper']
 
 
-import bs4
-import collections
 import dataclasses
 import datetime
 import itertools
 import json
 import logging
 import re
+import snscrape._html
 import snscrape.base
 import snscrape.utils
 import typing
@@ -37,6 +36,7 @@ _datePattern = re.compile(r'^(?P<date>today'
                                   r'|(?P<month2>' + '|'.join(_months) + r')\s+(?P<day2>\d+),\s+(?P<year2>\d{4})'
                            ')'
                           r'\s+at\s+(?P<hour>\d+):(?P<minute>\d+)\s+(?P<ampm>[ap]m)$')
+_GEOBLOCK_RESPONSE = '"\\/blank.php?block=119910902"'
 
 
 @dataclasses.dataclass
@@ -98,12 +98,19 @@ class User(snscrape.base.Item):
 		return f'https://vk.com/{self.username}'
 
 
-class VKontakteUserScraper(snscrape.base.Scraper):
+class _WallGeoblocked(Exception):
+	pass
+
+
+class VKontakteUserScraper(snscrape._html.HTMLScraper):
 	name = 'vkontakte-user'
 
-	def __init__(self, username, **kwargs):
+	def __init__(self, username, *, concurrency = 1, **kwargs):
 		super().__init__(**kwargs)
+		if concurrency < 1:
+			raise ValueError('concurrency must be positive')
 		self._username = username
+		self._concurrency = concurrency
 		self._baseUrl = f'https://vk.com/{self._username}'
 		self._headers = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64; rv:52.0) Gecko/20100101 Firefox/52.0', 'Accept-Language': 'en-US,en;q=0.5'}
 		self._initialPage = None
@@ -237,7 +244,7 @@ class VKontakteUserScraper(snscrape.base.Scraper):
 			if r.status_code not in (200, 404):
 				raise snscrape.base.ScraperException(f'Got status code {r.status_code}')
 			# VK sends windows-1251-encoded data, but Requests's decoding doesn't seem to work correctly and causes lxml to choke, so we need to pass the binary content and the encoding explicitly.
-			self._initialPage, self._initialPageSoup = r, bs4.BeautifulSoup(r.content, 'lxml', from_encoding = r.encoding)
+			self._initialPage, self._initialPageSoup = r, self._parse_html(r.content, encoding = r.encoding)
 		return self._initialPage, self._initialPageSoup
 
 	def get_items(self):
@@ -266,42 +273,131 @@ class VKontakteUserScraper(snscrape.base.Scraper):
 		else:
 			fixedPostID = ''
 
-		last1000PostIDs = collections.deque(maxlen = 1000)
+		last1000PostIDs = snscrape.base.BoundedSet(1000)
 
-		def _process_soup(soup):
-			nonlocal last1000PostIDs
-			for item in self._soup_to_items(soup):
+		def _process_items(items):
+			for item in items:
 				postID = int(item.url.rsplit('_', 1)[1])
 				if postID not in last1000PostIDs:
 					yield item
-					last1000PostIDs.append(postID)
-
-		yield from _process_soup(soup)
-
-		lastWorkingOffset = 0
-		for offset in itertools.count(start = 10, step = 10):
-			posts = self._get_wall_offset(fixedPostID, ownerID, offset)
-			if posts.startswith('<div class="page_block no_posts">'):
+					last1000PostIDs.add(postID)
+
+		yield from _process_items(self._soup_to_items(soup))
+
+		# Positions are the posts' indices on the wall; the page at offset o contains positions o to o + 9.
+		# coveredUntil is the last position that was retrieved or found to be unrecoverable, goodFrom the start of the run of retrieved positions ending there.
+		coveredUntil = 9
+		goodFrom = 0
+		blockedOffsets = set()
+		for offset, items in self._iter_wall_pages(fixedPostID, ownerID):
+			if items is None:
+				blockedOffsets.add(offset)
+				if offset + 9 <= coveredUntil:
+					# Already recovered while working around a previous geoblock
+					continue
+				_logger.warning(f'Encountered geoblock on offset {offset}, trying to work around the block but might be missing content')
+				items, coveredUntil, goodFrom = self._recover_geoblocked(fixedPostID, ownerID, coveredUntil + 1, offset + 9, goodFrom, blockedOffsets)
+				yield from _process_items(items)
+				continue
+			if offset > coveredUntil + 1:
+				goodFrom = offset
+			coveredUntil = max(coveredUntil, offset + 9)
+			yield from _process_items(items)
+
+	def _recover_geoblocked(self, fixedPostID, ownerID, start, end, goodFrom, blockedOffsets):
+		'''Retrieve as many of the posts at positions start to end as possible when the wall page covering them is geoblocked
+
+		A page is geoblocked if any of its ten posts is. To recover position p, the page covering p and reaching furthest without a geoblocked post is searched for among the offsets max(p - 9, goodFrom) to p.
+		Since the positions between goodFrom and p are known to be retrievable, those pages are blocked exactly when they reach a blocked post, so the search is a bisection (or a (concurrency + 1)-ary search with concurrent probes) rather than a linear scan.
+		Blocked offsets are remembered in blockedOffsets and never requested again.
+
+		Returns the recovered items in offset order, the last position handled, and the updated goodFrom.
+		'''
+
+		pages = {} # offset -> items, or None if the offset is past the end of the wall
+
+		def probe(offsets):
+			offsets = [o for o in offsets if o not in pages and o not in blockedOffsets]
+			if not offsets:
+				return
+			futures = {o: executor.submit(self._get_wall_offset_items, fixedPostID, ownerID, o) for o in offsets}
+			for o, future in futures.items():
+				try:
+					pages[o] = future.result()
+				except _WallGeoblocked:
+					blockedOffsets.add(o)
+
+		position = start
+		with snscrape.base._ThreadPoolExecutor(max_workers = self._concurrency) as executor:
+			while position <= end:
+				probe([position])
+				if position in pages:
+					if pages[position] is None:
+						break
+					position += 10
+					continue
+				# Search for the largest unblocked offset between low and high
+				low, high = max(position - 9, goodFrom), position - 1
+				best = None
+				while low <= high:
+					n = high - low + 1
+					points = sorted({low + (i + 1) * n // (self._concurrency + 1) for i in range(self._concurrency)} & set(range(low, high + 1)))
+					if not points:
+						points = [low]
+					probe(points)
+					if (good := [o for o in points if o in pages and pages[o] is not None]):
+						best = max(good)
+						low = best + 1
+					if (blocked := [o for o in points if o in blockedOffsets and (best is None or o > best)]):
+						high = min(blocked) - 1
+					if not good and not blocked:
+						# Past the end of the wall, which should not happen below an existing position
+						break
+				if best is None:
+					# Every page containing this position that does not reach back into unretrievable positions is blocked.
+					_logger.info(f'Could not retrieve the post at position {position}')
+					position += 1
+					goodFrom = position
+					continue
+				# The page after best is blocked, so position best + 10 is a blocked post.
+				_logger.info(f'Could not retrieve the post at position {best + 10}')
+				position = best + 11
+				goodFrom = position
+		items = [item for o in sorted(pages) if pages[o] is not None for item in pages[o]]
+		return items, max(position - 1, end), goodFrom
+
+	def _iter_wall_pages(self, fixedPostID, ownerID):
+		'''Yield (offset, items) for the wall pages from offset 10 onwards in offset order until the end of the wall; items is None if the page is geoblocked
+
+		Up to self._concurrency pages are retrieved and parsed concurrently in worker threads.
+		'''
+
+		def get_page(offset):
+			try:
+				return offset, self._get_wall_offset_items(fixedPostID, ownerID, offset), False
+			except _WallGeoblocked:
+				return offset, None, True
+
+		for offset, items, geoblocked in snscrape.base._map_concurrently(get_page, itertools.count(start = 10, step = 10), self._concurrency):
+			if geoblocked:
+				yield offset, None
+				continue
+			if items is None:
 				# Reached the end
 				break
-			if not posts.startswith('<div id="post'):
-				if posts == '"\\/blank.php?block=119910902"':
-					_logger.warning(f'Encountered geoblock on offset {offset}, trying to work around the block but might be missing content')
-					for geoblockOffset in range(lastWorkingOffset + 1, offset + 10):
-						geoPosts = self._get_wall_offset(fixedPostID, ownerID, geoblockOffset)
-						if geoPosts.startswith('<div class="page_block no_posts">'):
-							# No breaking the outer loop, it'll just make one extra request and exit as well
-							break
-						if not geoPosts.startswith('<div id="post'):
-							if geoPosts == '"\\/blank.php?block=119910902"':
-								continue
-							raise snscrape.base.ScraperException(f'Got an unknown response: {geoPosts[:200]!r}...')
-						yield from _process_soup(soup = bs4.BeautifulSoup(geoPosts, 'lxml'))
-					continue
-				raise snscrape.base.ScraperException(f'Got an unknown response: {posts[:200]!r}...')
-			lastWorkingOffset = offset
-			soup = bs4.BeautifulSoup(posts, 'lxml')
-			yield from _process_soup(soup)
+			yield offset, items
+
+	def _get_wall_offset_items(self, fixedPostID, ownerID, offset):
+		'''Retrieve and parse the wall page at offset; returns None at the end of the wall and raises _WallGeoblocked on a geoblock'''
+
+		posts = self._get_wall_offset(fixedPostID, ownerID, offset)
+		if posts.startswith('<div class="page_block no_posts">'):
+			return None
+		if not posts.startswith('<div id="post'):
+			if posts == _GEOBLOCK_RESPONSE:
+				raise _WallGeoblocked
+			raise snscrape.base.ScraperException(f'Got an unknown response: {posts[:200]!r}...')
+		return list(self._soup_to_items(self._parse_html(posts)))
 
 	def _get_wall_offset(self, fixedPostID, ownerID, offset):
 		headers = self._headers.copy()
@@ -385,8 +481,10 @@ class VKontakteUserScraper(snscrape.base.Scraper):
 
 	@classmethod
 	def _cli_setup_parser(cls, subparser):
+		cls._cli_setup_html_parser_argument(subparser)
+		subparser.add_argument('--concurrency', metavar = 'N', type = int, default = 1, help = 'Retrieve up to N wall pages concurrently')
 		subparser.add_argument('username', type = snscrape.utils.nonempty_string_arg('username'), help = 'A VK username')
 
 	@classmethod
 	def _cli_from_args(cls, args):
-		return cls._cli_construct(args, args.username)
+		return cls._cli_construct(args, args.username, concurrency = args.concurrency)
@@ -0,0 +1,107 @@
+import dataclasses
+import functools
+import itertools
+import pytest
+import snscrape.base
+import threading
+import time
+
+
+@dataclasses.dataclass
+class _Number(snscrape.base.Item):
+	value: int
+
+	def __str__(self):
+		return str(self.value)
+
+
+def _slow_handler(request):
+	time.sleep(0.05)
+	return snscrape.base.MockTransport.response(request, body = 'ok')
+
+
+class _SequentialScraper(snscrape.base.Scraper):
+	def __init__(self, n, **kwargs):
+		super().__init__(**kwargs)
+		self._n = n
+
+	def get_items(self):
+		for i in range(self._n):
+			self._get(f'https://example.test/{i}')
+			yield _Number(i)
+
+
+class _ConcurrentScraper(_SequentialScraper):
+	def _numbers(self, i):
+		self._get(f'https://example.test/{i}')
+		yield _Number(i)
+
+	def get_items(self):
+		yield from snscrape.base._iter_concurrently((functools.partial(self._numbers, i) for i in range(self._n)), 4, 1)
+
+
+def test_deadline_applies_only_to_its_call():
+	scraper = _SequentialScraper(20, transport = snscrape.base.MockTransport(_slow_handler))
+	results = {}
+	started = threading.Event()
+
+	def without_deadline():
+		started.set()
+		results['without'] = list(scraper.get_items())
+
+	def with_deadline():
+		started.wait()
+		results['with'] = list(scraper.get_items(deadline = 0.2))
+
+	threads = [threading.Thread(target = f) for f in (without_deadline, with_deadline)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+
+	assert results['without'] == [_Number(i) for i in range(20)]
+	assert results['with'][-1] == snscrape.base.PartialResults(reason = 'deadline')
+	assert len(results['with']) < 20
+
+
+def test_deadline_applies_to_worker_threads():
+	cancel = threading.Event()
+	cancel.set()
+	scraper = _ConcurrentScraper(8, transport = snscrape.base.MockTransport(_slow_handler))
+	assert list(scraper.get_items(cancel = cancel)) == [snscrape.base.PartialResults(reason = 'cancelled')]
+	assert scraper._transport.requests == []
+
+
+def _slow_square(x):
+	if x == 13:
+		raise ValueError(x)
+	time.sleep(0.01 * (x % 3))
+	return x * x
+
+
+@pytest.mark.parametrize('concurrency', [1, 4])
+def test_map_concurrently_in_order(concurrency):
+	assert list(snscrape.base._map_concurrently(_slow_square, range(13), concurrency)) == [x * x for x in range(13)]
+
+
+@pytest.mark.parametrize('concurrency', [1, 4])
+def test_map_concurrently_consumes_lazily(concurrency):
+	consumed = []
+
+	def numbers():
+		for x in itertools.count():
+			consumed.append(x)
+			yield x
+
+	results = snscrape.base._map_concurrently(_slow_square, numbers(), concurrency)
+	assert [next(results) for _ in range(3)] == [0, 1, 4]
+	results.close()
+	assert len(consumed) <= 3 + concurrency
+
+
+def test_map_concurrently_raises_in_position():
+	results = []
+	with pytest.raises(ValueError):
+		for result in snscrape.base._map_concurrently(_slow_square, range(20), 4):
+			results.append(result)
+	assert results == [x * x for x in range(13)]
@@ -0,0 +1,34 @@
+import importlib.util
+import pytest
+import snscrape._cli
+import sys
+
+
+def _parse_args(monkeypatch, *args):
+	monkeypatch.setattr(sys, 'argv', ['snscrape', *args])
+	return snscrape._cli.parse_args()
+
+
+@pytest.mark.parametrize('scraper', ['reddit-submissions', 'twitter-users', 'twitter-tweets'])
+def test_ids_required(scraper, monkeypatch, capsys):
+	with pytest.raises(SystemExit) as excInfo:
+		_parse_args(monkeypatch, scraper)
+	assert excInfo.value.code == 2
+	assert 'IDs given' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('scraper, ids', [('reddit-submissions', 'abc'), ('twitter-users', '123'), ('twitter-tweets', '123')])
+def test_ids_from_file(scraper, ids, monkeypatch, tmp_path):
+	idsFile = tmp_path / 'ids.txt'
+	idsFile.write_text(f'{ids}\n')
+	args = _parse_args(monkeypatch, scraper, '--ids-file', str(idsFile))
+	args.cls._cli_from_args(args)
+
+
+def test_http2_transport_requires_httpx(monkeypatch, capsys):
+	findSpec = importlib.util.find_spec
+	monkeypatch.setattr(importlib.util, 'find_spec', lambda name, *args: None if name == 'httpx' else findSpec(name, *args))
+	with pytest.raises(SystemExit) as excInfo:
+		_parse_args(monkeypatch, '--transport', 'http2', 'reddit-submission', 'abc')
+	assert excInfo.value.code == 2
+	assert '--transport http2 requires httpx' in capsys.readouterr().err
@@ -0,0 +1,124 @@
+import collections
+import json
+import pathlib
+import pytest
+import requests
+import requests.adapters
+import snscrape._html
+import snscrape.base
+import snscrape.modules.facebook
+import snscrape.modules.mastodon
+import snscrape.modules.telegram
+import snscrape.modules.vkontakte
+
+
+_DATA = pathlib.Path(__file__).parent / 'data'
+_PARSERS = tuple(snscrape.base.HTMLParser)
+
+
+class _SavedPages(requests.adapters.BaseAdapter):
+	'''A requests adapter answering requests with saved pages instead of sending them
+
+	Responses registered for the same method and URL are returned in order, and the last one is repeated.
+	'''
+
+	def __init__(self):
+		super().__init__()
+		self._responses = collections.defaultdict(collections.deque)
+
+	def add(self, url, body, contentType, *, method = 'GET'):
+		self._responses[(method, url)].append((body, contentType))
+
+	def send(self, request, **kwargs):
+		queue = self._responses.get((request.method, request.url))
+		if not queue:
+			raise requests.exceptions.ConnectionError(f'No saved page for {request.method} {request.url}', request = request)
+		body, contentType = queue.popleft() if len(queue) > 1 else queue[0]
+		r = requests.Response()
+		r.request = request
+		r.url = request.url
+		r.status_code = 200
+		r.reason = 'OK'
+		r.headers = requests.structures.CaseInsensitiveDict({'Content-Type': contentType})
+		r._content = body.encode('utf-8') if isinstance(body, str) else body
+		r._content_consumed = True
+		r.encoding = requests.utils.get_encoding_from_headers(r.headers)
+		return r
+
+	def close(self):
+		pass
+
+
+def _read(name):
+	return (_DATA / name).read_bytes()
+
+
+def _telegram(htmlParser, pages):
+	pages.add('https://t.me/s/snscrape_test', _read('telegram_channel_posts.html'), 'text/html; charset=utf-8')
+	pages.add('https://t.me/snscrape_test', _read('telegram_channel.html'), 'text/html; charset=utf-8')
+	return snscrape.modules.telegram.TelegramChannelScraper('snscrape_test', htmlParser = htmlParser)
+
+
+def _mastodon(htmlParser, pages):
+	# The rate limit is shared by the scrapers for both engines.
+	snscrape.modules.mastodon.set_rate_limit('mastodon.example', None)
+	pages.add('https://mastodon.example/@alice/with_replies', _read('mastodon_profile.html'), 'text/html; charset=utf-8')
+	return snscrape.modules.mastodon.MastodonProfileScraper('@alice@mastodon.example', htmlParser = htmlParser)
+
+
+def _vkontakte(htmlParser, pages):
+	pages.add('https://vk.com/snscrape_test', _read('vkontakte_user.html'), 'text/html; charset=windows-1251')
+	for fragment in (_read('vkontakte_wall.html').decode('utf-8'), '<div class="page_block no_posts">No posts</div>'):
+		pages.add('https://vk.com/al_wall.php', json.dumps({'payload': [0, [fragment]]}), 'application/json', method = 'POST')
+	return snscrape.modules.vkontakte.VKontakteUserScraper('snscrape_test', htmlParser = htmlParser)
+
+
+def _facebook(htmlParser, pages):
+	pages.add('https://www.facebook.com/snscrape.test/', _read('facebook_user.html'), 'text/html; charset=utf-8')
+	return snscrape.modules.facebook.FacebookUserScraper('snscrape.test', htmlParser = htmlParser)
+
+
+def _scrape(factory, htmlParser):
+	pages = _SavedPages()
+	scraper = factory(htmlParser, pages)
+	scraper._session.mount('https://', pages)
+	return list(scraper.get_items()), scraper.entity
+
+
+@pytest.mark.parametrize('factory, hasEntity', [(_telegram, True), (_mastodon, False), (_vkontakte, True), (_facebook, True)])
+def test_engines_produce_equal_items(factory, hasEntity):
+	results = [_scrape(factory, htmlParser) for htmlParser in _PARSERS]
+	items, entity = results[0]
+	assert items
+	assert (entity is not None) == hasEntity
+	for other in results[1:]:
+		assert other == results[0]
+
+
+_SNIPPET = '''<div class="a  b
+c" id="x"><p class="note" title='say "hi"' data-x="it's">1 &lt; 2 &amp; 3 &gt; 2<br>&nbsp;done</p><a rel="nofollow noopener" href="?a=1&amp;b=2">link</a><td headers="h1 h2">cell</td><script>if (a < b && c) {}</script><!-- note --></div>'''
+
+
+@pytest.mark.parametrize('name', ['div', 'p', 'a', 'script'])
+def test_engines_serialise_tags_equally(name):
+	strings = [str(snscrape._html.parse(_SNIPPET, htmlParser).find(name)) for htmlParser in _PARSERS]
+	assert all(s == strings[0] for s in strings)
+
+
+@pytest.mark.parametrize('kwargs', [
+	{'class_': 'a'},
+	{'class_': 'c'},
+	{'class_': 'b c'},
+	{'class_': 'a b c'},
+	{'class_': 'a  b\nc'},
+	{'class_': 'b a'},
+	{'rel': 'nofollow'},
+	{'rel': 'nofollow noopener'},
+	{'headers': 'h2'},
+])
+def test_engines_match_multi_valued_attributes_equally(kwargs):
+	results = []
+	for htmlParser in _PARSERS:
+		soup = snscrape._html.parse(_SNIPPET, htmlParser)
+		results.append([(tag.name, tag.attrs) for tag in soup.find_all(**kwargs)])
+	assert all(r == results[0] for r in results)
@@ -0,0 +1,120 @@
+import datetime
+import json
+import pathlib
+import pytest
+import snscrape.base
+import snscrape.modules.mastodon
+
+
+_DATA = pathlib.Path(__file__).parent / 'data'
+_JSON = {'Content-Type': 'application/json; charset=utf-8'}
+
+
+def _status(host, id):
+	return {
+		'id': str(id),
+		'url': f'https://{host}/@alice/{id}',
+		'uri': f'https://{host}/users/alice/statuses/{id}',
+		'created_at': '2023-01-02T03:04:05.678Z',
+		'account': {'acct': 'alice', 'username': 'alice', 'display_name': 'Alice', 'url': f'https://{host}/@alice', 'avatar': '/avatars/alice.png'},
+		'content': f'<p>Toot {id}</p>',
+	}
+
+
+def _statuses(host, ids):
+	return json.dumps([_status(host, id) for id in ids])
+
+
+def _scraper(host, transport, backend = snscrape.modules.mastodon.MastodonBackend.API, **kwargs):
+	# The rate limits are shared by all scrapers in the process; don't let the tests wait for them.
+	snscrape.modules.mastodon.set_rate_limit(host, None)
+	return snscrape.modules.mastodon.MastodonProfileScraper(f'@alice@{host}', backend = backend, transport = transport, **kwargs)
+
+
+def _ids(items):
+	return [item.id for item in items]
+
+
+def test_api_follows_link_header():
+	host = 'links.example'
+	transport = snscrape.base.MockTransport()
+	transport.add(f'https://{host}/api/v1/accounts/lookup?acct=alice', headers = _JSON, body = json.dumps({'id': '1'}))
+	transport.add(f'https://{host}/api/v1/accounts/1/statuses?limit=40', headers = {**_JSON, 'Link': f'<https://{host}/api/v1/accounts/1/statuses?limit=40&max_id=8>; rel="next"'}, body = _statuses(host, [10, 9, 8]))
+	transport.add(f'https://{host}/api/v1/accounts/1/statuses?limit=40&max_id=8', headers = _JSON, body = _statuses(host, [7, 6]))
+	transport.add(f'https://{host}/api/v1/accounts/1/statuses?limit=40&max_id=6', headers = _JSON, body = '[]')
+	# After a page without a Link header, pagination continues from the statuses endpoint rather than the previous page's URL.
+	assert _ids(_scraper(host, transport).get_items()) == ['10', '9', '8', '7', '6']
+	assert [r.url for r in transport.requests][-1] == f'https://{host}/api/v1/accounts/1/statuses?limit=40&max_id=6'
+
+
+def test_api_paginates_by_max_id_without_link_header():
+	host = 'maxid.example'
+	transport = snscrape.base.MockTransport()
+	transport.add(f'https://{host}/api/v1/accounts/lookup?acct=alice', headers = _JSON, body = json.dumps({'id': '1'}))
+	transport.add(f'https://{host}/api/v1/accounts/1/statuses?limit=40', headers = _JSON, body = _statuses(host, [10, 9]))
+	transport.add(f'https://{host}/api/v1/accounts/1/statuses?limit=40&max_id=9', headers = _JSON, body = _statuses(host, [8]))
+	transport.add(f'https://{host}/api/v1/accounts/1/statuses?limit=40&max_id=8', headers = _JSON, body = '[]')
+	assert _ids(_scraper(host, transport).get_items()) == ['10', '9', '8']
+
+
+class _SleepRecordingTransport(snscrape.base.MockTransport):
+	'''A MockTransport recording which of the `sleeps` had happened when each request was sent'''
+
+	def __init__(self, sleeps):
+		super().__init__()
+		self._sleeps = sleeps
+		self.sleepsBeforeRequest = []
+
+	def send(self, *args, **kwargs):
+		self.sleepsBeforeRequest.append(list(self._sleeps))
+		return super().send(*args, **kwargs)
+
+
+def test_api_waits_once_for_rate_limit_reset(monkeypatch):
+	host = 'ratelimited.example'
+	sleeps = []
+	monkeypatch.setattr(snscrape.base.ScrapeContext, 'sleep', lambda self, seconds: sleeps.append(seconds))
+	reset = (datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds = 30)).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+	transport = _SleepRecordingTransport(sleeps)
+	transport.add(f'https://{host}/api/v1/accounts/lookup?acct=alice', status = 429, headers = {**_JSON, 'X-RateLimit-Reset': reset}, body = '{}')
+	transport.add(f'https://{host}/api/v1/accounts/lookup?acct=alice', headers = _JSON, body = json.dumps({'id': '1'}))
+	transport.add(f'https://{host}/api/v1/accounts/1/statuses?limit=40', headers = _JSON, body = '[]')
+	scraper = _scraper(host, transport, retryPolicy = snscrape.base.RetryPolicy(3, backoff = 1, jitter = 0))
+	assert list(scraper.get_items()) == []
+	# The retry waits for the reset exactly once rather than sleeping until the reset and then the backoff on top.
+	assert len(transport.sleepsBeforeRequest[1]) == 1
+	assert 29 < transport.sleepsBeforeRequest[1][0] <= 30
+	# Other requests to the instance wait for the reset as well.
+	assert transport.sleepsBeforeRequest[2][1] > 28
+
+
+def _html_profile_transport():
+	transport = snscrape.base.MockTransport()
+	transport.add('https://mastodon.example/@alice/with_replies', headers = {'Content-Type': 'text/html; charset=utf-8'}, body = (_DATA / 'mastodon_profile.html').read_bytes())
+	return transport
+
+
+def _html_profile_items():
+	return list(_scraper('mastodon.example', _html_profile_transport(), backend = snscrape.modules.mastodon.MastodonBackend.HTML).get_items())
+
+
+@pytest.mark.parametrize('status, headers', [
+	(401, _JSON), # Instance requiring authentication
+	(404, _JSON), # Instance before 3.4 without the lookup endpoint
+	(404, {'Content-Type': 'text/html'}),
+	(200, {'Content-Type': 'text/html'}), # Not a Mastodon API at all
+])
+def test_auto_falls_back_to_html(status, headers):
+	transport = _html_profile_transport()
+	transport.add('https://mastodon.example/api/v1/accounts/lookup?acct=alice', status = status, headers = headers, body = '{"error": "Record not found"}' if headers is _JSON else '<html></html>')
+	items = list(_scraper('mastodon.example', transport, backend = snscrape.modules.mastodon.MastodonBackend.AUTO).get_items())
+	assert items
+	assert items == _html_profile_items()
+
+
+def test_api_does_not_fall_back_to_html():
+	transport = _html_profile_transport()
+	transport.add('https://mastodon.example/api/v1/accounts/lookup?acct=alice', status = 404, headers = _JSON, body = '{"error": "Record not found"}')
+	with pytest.raises(snscrape.base.ScraperException, match = 'API unavailable'):
+		list(_scraper('mastodon.example', transport).get_items())
+	assert all('/api/' in r.url for r in transport.requests)
@@ -0,0 +1,82 @@
+import json
+import pytest
+import snscrape.base
+import snscrape.modules.reddit
+import string
+import urllib.parse
+
+
+_AFTER = 1000
+_BEFORE = 1100
+_PAGE_SIZE = 7 # Smaller than the requested limit so that partitions span several pages
+
+
+def _base36(n):
+	digits = string.digits + string.ascii_lowercase
+	s = ''
+	while True:
+		n, d = divmod(n, 36)
+		s = digits[d] + s
+		if n == 0:
+			return s
+
+
+def _comments():
+	# Two comments per second, including at the time range's and all partitions' boundaries; IDs increase with time like on Reddit
+	comments = []
+	for createdUtc in range(_AFTER - 5, _BEFORE + 6):
+		for _ in range(2):
+			id_ = _base36(1000 + len(comments))
+			comments.append({'id': id_, 'created_utc': createdUtc, 'author': 'alice', 'body': f'Comment {id_}', 'subreddit': 'test', 'link_id': 't3_abc', 'parent_id': 't3_abc', 'permalink': f'/r/test/comments/abc/_/{id_}/'})
+	return comments
+
+
+class _Pushshift:
+	'''A handler for MockTransport imitating the Pushshift comment search with its exclusive since and until parameters'''
+
+	def __init__(self):
+		self._comments = sorted(_comments(), key = lambda d: (d['created_utc'], int(d['id'], 36)), reverse = True)
+
+	def __call__(self, request):
+		query = urllib.parse.parse_qs(urllib.parse.urlsplit(request.url).query)
+		since = int(query['since'][0]) if 'since' in query else None
+		until = int(query['until'][0]) if 'until' in query else None
+		data = [d for d in self._comments if (since is None or d['created_utc'] > since) and (until is None or d['created_utc'] < until)]
+		return snscrape.base.MockTransport.response(request, headers = {'Content-Type': 'application/json'}, body = json.dumps({'data': data[:_PAGE_SIZE]}))
+
+
+@pytest.fixture(autouse = True)
+def rateLimiter(monkeypatch):
+	rateLimiter = snscrape.base.RateLimiter(None)
+	monkeypatch.setattr(snscrape.modules.reddit, '_rateLimiter', rateLimiter)
+	return rateLimiter
+
+
+def _scraper(concurrency):
+	return snscrape.modules.reddit.RedditSubredditScraper('test', submissions = False, before = _BEFORE, after = _AFTER, concurrency = concurrency, transport = snscrape.base.MockTransport(_Pushshift()))
+
+
+@pytest.mark.parametrize('concurrency', [1, 2, 3])
+def test_partitions_neither_duplicate_nor_drop_boundary_items(concurrency):
+	expected = [f't1_{d["id"]}' for d in sorted(_comments(), key = lambda d: int(d['id'], 36), reverse = True) if _AFTER < d['created_utc'] < _BEFORE]
+	assert [item.id for item in _scraper(concurrency).get_items()] == expected
+
+
+@pytest.mark.parametrize('concurrency', [1, 2, 3, 1000])
+def test_partition_bounds_are_contiguous(concurrency):
+	bounds = _scraper(concurrency)._partition_bounds()
+	assert bounds[0][1] is None
+	assert bounds[-1][0] is None
+	for (lower, _), (_, upper) in zip(bounds, bounds[1:]):
+		assert _AFTER < lower < _BEFORE
+		assert lower == upper
+	assert len(bounds) == min(concurrency * snscrape.modules.reddit._PARTITIONS_PER_WORKER, _BEFORE - _AFTER)
+
+
+def test_sequential_scraping_is_not_rate_limited(rateLimiter, monkeypatch):
+	acquisitions = []
+	monkeypatch.setattr(rateLimiter, 'acquire', lambda context = None: acquisitions.append(context))
+	assert list(_scraper(1).get_items())
+	assert acquisitions == []
+	assert list(_scraper(2).get_items())
+	assert acquisitions
@@ -0,0 +1,77 @@
+import http.server
+import pathlib
+import pytest
+import requests
+import snscrape.base
+import snscrape.modules.twitter
+import ssl
+import threading
+
+
+_DATA = pathlib.Path(__file__).parent / 'data'
+_CA_BUNDLE = str(_DATA / 'tls_ca.pem') # The CA that signed tls_server.pem, valid for localhost and 127.0.0.1
+_TRANSPORTS = (snscrape.base.RequestsTransport, snscrape.base.Urllib3Transport)
+_ADAPTERS = (snscrape.base._HTTPSAdapter, snscrape.modules.twitter._TwitterTLSAdapter)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+	def do_GET(self):
+		self.send_response(200)
+		self.send_header('Content-Length', '2')
+		self.end_headers()
+		self.wfile.write(b'ok')
+
+	def log_message(self, *args):
+		pass
+
+
+@pytest.fixture(scope = 'module')
+def httpsUrl():
+	server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+	context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+	context.load_cert_chain(_DATA / 'tls_server.pem')
+	server.socket = context.wrap_socket(server.socket, server_side = True)
+	thread = threading.Thread(target = server.serve_forever, daemon = True)
+	thread.start()
+	yield f'https://127.0.0.1:{server.server_address[1]}/'
+	server.shutdown()
+	server.server_close()
+
+
+def _session(adapterCls, verify):
+	# A new adapter for each session since adapters with their own SSL context keep the loaded CA certificates in it
+	session = requests.Session()
+	session.trust_env = False
+	session.mount('https://', adapterCls())
+	session.verify = verify
+	return session
+
+
+@pytest.mark.parametrize('transportCls', _TRANSPORTS)
+@pytest.mark.parametrize('adapterCls', _ADAPTERS)
+def test_verifies_against_session_ca_bundle(transportCls, adapterCls, httpsUrl):
+	r = transportCls().send(_session(adapterCls, _CA_BUNDLE), 'GET', httpsUrl)
+	assert r.status_code == 200
+	assert r.content == b'ok'
+
+
+@pytest.mark.parametrize('transportCls', _TRANSPORTS)
+@pytest.mark.parametrize('adapterCls', _ADAPTERS)
+def test_rejects_certificate_not_in_default_ca_bundle(transportCls, adapterCls, httpsUrl):
+	with pytest.raises(requests.exceptions.SSLError):
+		transportCls().send(_session(adapterCls, True), 'GET', httpsUrl)
+
+
+@pytest.mark.filterwarnings('ignore::urllib3.exceptions.InsecureRequestWarning')
+@pytest.mark.parametrize('transportCls', _TRANSPORTS)
+def test_verification_can_be_disabled(transportCls, httpsUrl):
+	r = transportCls().send(_session(snscrape.base._HTTPSAdapter, False), 'GET', httpsUrl)
+	assert r.status_code == 200
+
+
+def test_environment_ca_bundle(httpsUrl, monkeypatch):
+	monkeypatch.setenv('REQUESTS_CA_BUNDLE', _CA_BUNDLE)
+	session = _session(snscrape.modules.twitter._TwitterTLSAdapter, True)
+	session.trust_env = True
+	r = snscrape.base.Urllib3Transport().send(session, 'GET', httpsUrl)
+	assert r.status_code == 200
@@ -0,0 +1,173 @@
+import concurrent.futures
+import dataclasses
+import http.server
+import itertools
+import json
+import pytest
+import random
+import snscrape.base
+import snscrape.modules.twitter
+import threading
+import time
+import urllib.parse
+
+
+class _RevokingTwitter:
+	'''A local HTTP server imitating Twitter's guest token handling
+
+	GET / issues a new guest token as the gt cookie. API requests succeed with the current token; every so often, the current token is revoked instead, after which requests with it are rejected with 429 until a new one is fetched.
+	Like on Twitter, API responses also set cookies: each one sets a new cookie and expires the previous one, so the scraper's cookie jar keeps changing size while other threads use it and tokens are replaced.
+	'''
+
+	def __init__(self, revokeProbability, seed):
+		self._random = random.Random(seed)
+		self._revokeProbability = revokeProbability
+		self._lock = threading.Lock()
+		self._token = None
+		self._nextToken = 1
+		self.fetches = 0
+		self.apiRequests = 0
+		self.revocations = 0
+		self.rejected = 0
+		self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+		self.url = f'http://127.0.0.1:{self._server.server_address[1]}/'
+
+	def _handler_class(self):
+		twitter = self
+
+		class Handler(http.server.BaseHTTPRequestHandler):
+			protocol_version = 'HTTP/1.1'
+
+			def do_GET(self):
+				status, headers, body = twitter._respond(self.path, self.headers)
+				self.send_response(status)
+				for name, value in headers:
+					self.send_header(name, value)
+				self.send_header('Content-Length', str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def log_message(self, *args):
+				pass
+
+		return Handler
+
+	def _respond(self, path, headers):
+		if path == '/':
+			with self._lock:
+				self._token = str(self._nextToken)
+				self._nextToken += 1
+				self.fetches += 1
+				token = self._token
+			return 200, [('Content-Type', 'text/html'), ('Set-Cookie', f'gt={token}; Path=/')], b'<html></html>'
+		with self._lock:
+			self.apiRequests += 1
+			requestNumber = self.apiRequests
+			valid = self._token is not None and headers.get('x-guest-token') == self._token
+			if valid and self._random.random() < self._revokeProbability:
+				self._token = None
+				self.revocations += 1
+				valid = False
+			if not valid:
+				self.rejected += 1
+		responseHeaders = [('Content-Type', 'application/json;charset=utf-8'), ('Set-Cookie', f'att{requestNumber}=1; Path=/'), ('Set-Cookie', f'att{requestNumber - 1}=; Path=/; Max-Age=0')]
+		if not valid:
+			return 429, responseHeaders, b'{}'
+		return 200, responseHeaders, json.dumps({'data': {'path': path}}).encode('utf-8')
+
+	def __enter__(self):
+		threading.Thread(target = self._server.serve_forever, daemon = True).start()
+		return self
+
+	def __exit__(self, *args):
+		self._server.shutdown()
+		self._server.server_close()
+
+
+@dataclasses.dataclass
+class _Number(snscrape.base.Item):
+	value: int
+
+	def __str__(self):
+		return str(self.value)
+
+
+class _NumbersScraper(snscrape.modules.twitter._TwitterAPIScraper):
+	'''A scraper retrieving numbers from the imitated API, one request each'''
+
+	def fetch(self, i):
+		obj = self._get_api_data(f'{self._baseUrl}i/api/graphql/x/Test', snscrape.modules.twitter._TwitterAPIType.GRAPHQL, params = {'variables': {'i': i}, 'features': {}}, instructionsPath = ['data'])
+		query = urllib.parse.parse_qs(urllib.parse.urlsplit(obj['data']['path']).query)
+		return json.loads(query['variables'][0])['i']
+
+	def get_items(self):
+		for i in itertools.count():
+			yield _Number(self.fetch(i))
+
+
+@pytest.fixture
+def twitter():
+	with _RevokingTwitter(revokeProbability = 0.02, seed = 50) as twitter:
+		yield twitter
+
+
+def _scraper(twitter, transportCls):
+	return _NumbersScraper(
+		twitter.url,
+		guestTokenManager = snscrape.modules.twitter.GuestTokenManager(),
+		transport = transportCls(),
+		retryPolicy = snscrape.base.RetryPolicy(10, backoff = 0.001, maxBackoff = 0.01),
+		circuitBreaker = snscrape.base.CircuitBreaker(),
+		retryBudget = snscrape.base.RetryBudget(maxBalance = 10 ** 6),
+	)
+
+
+def _fetch_concurrently(scraper, n):
+	with concurrent.futures.ThreadPoolExecutor(max_workers = 16) as executor:
+		return list(executor.map(scraper.fetch, range(n)))
+
+
+@pytest.mark.parametrize('transportCls', [snscrape.base.RequestsTransport, snscrape.base.Urllib3Transport])
+def test_shared_scraper_with_revoked_guest_tokens(twitter, transportCls):
+	scraper = _scraper(twitter, transportCls)
+	n = 1000
+	assert _fetch_concurrently(scraper, n) == list(range(n))
+	assert twitter.revocations > 0
+	# Every revocation requires one new token; the threads that notice it concurrently must not each fetch their own.
+	assert twitter.fetches <= twitter.revocations + 1
+
+
+@pytest.mark.parametrize('transportCls', [snscrape.base.RequestsTransport, snscrape.base.Urllib3Transport])
+def test_shared_scraper_with_deadline_of_another_caller(twitter, transportCls):
+	scraper = _scraper(twitter, transportCls)
+	items = scraper.get_items(deadline = 0.2)
+	assert next(items) == _Number(0)
+	# The deadline passes while that scrape is still in progress; it must not affect the other callers.
+	time.sleep(0.3)
+	n = 200
+	assert _fetch_concurrently(scraper, n) == list(range(n))
+	assert list(items) == [snscrape.base.PartialResults(reason = 'deadline')]
+
+
+class _PresetGuestTokenManager(snscrape.modules.twitter.GuestTokenManager):
+	'''A guest token manager that cannot be instantiated without arguments'''
+
+	def __init__(self, token):
+		super().__init__()
+		self.token = token
+
+
+def _guest_token_manager_with_token(token):
+	manager = snscrape.modules.twitter.GuestTokenManager()
+	manager.token = token
+	return manager
+
+
+@pytest.mark.parametrize('managerFactory', [_guest_token_manager_with_token, _PresetGuestTokenManager])
+def test_thread_scrapers_share_guest_token_manager(managerFactory):
+	manager = managerFactory('1')
+	scraper = snscrape.modules.twitter.TwitterUsersScraper([1, 2], concurrency = 2, guestTokenManager = manager)
+	with concurrent.futures.ThreadPoolExecutor(max_workers = 2) as executor:
+		managers = list(executor.map(lambda _: scraper._thread_scraper()._guestTokenManager, range(2)))
+	assert all(m is manager for m in managers)
+	assert manager.token == '1'